@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from .models import Tag, Task, User
+from .models import ArchivedTask, Tag, Task, User
 
 admin.site.register(User)
 admin.site.register(Task)
 admin.site.register(Tag)
+admin.site.register(ArchivedTask)
@@ -0,0 +1,36 @@
+import json
+
+from django.db.models import Aggregate, JSONField
+
+
+class GroupArray(Aggregate):
+    """
+    Collect a grouped column into a sorted Python list in a single query.
+
+    PostgreSQL uses ARRAY_AGG(... ORDER BY ...); SQLite has no arrays, so it uses
+    JSON_GROUP_ARRAY and the result is decoded and sorted in Python (SQLite's
+    default BINARY collation orders strings by code point, same as sorted()).
+    NULLs, e.g. from a LEFT JOIN with no match, are dropped, so an empty group
+    becomes [].
+    """
+
+    function = "ARRAY_AGG"
+    template = "%(function)s(%(distinct)s%(expressions)s ORDER BY %(expressions)s)"
+    output_field = JSONField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        clone = self.copy()
+        clone.function = "JSON_GROUP_ARRAY"
+        clone.template = "%(function)s(%(distinct)s%(expressions)s)"
+        return clone.as_sql(compiler, connection, **extra_context)
+
+    def get_db_converters(self, connection):
+        # Skip JSONField's converter: PostgreSQL already returns a list
+        return [self.convert_value]
+
+    def convert_value(self, value, expression, connection):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return sorted(item for item in json.loads(value) if item is not None)
+        return [item for item in value if item is not None]
@@ -0,0 +1,188 @@
+"""
+Async variants of the API views, served instead of views.py when
+API_ASYNC_VIEWS is enabled (run the backend under ASGI for that).
+
+Reads use the async ORM and cache directly. Writes need a transaction,
+which the async ORM can't open, so they run the sync handlers from
+views.py in a worker thread.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from . import views
+from .models import User
+from .ratelimit import rate_limit
+from .responses import FastJsonResponse
+from .serializers import (
+    ClearAllSerializer,
+    RegisterSerializer,
+    TagActionSerializer,
+    TagCreateSerializer,
+    TagSerializer,
+    TaskActionSerializer,
+    TaskBulkActionSerializer,
+    TaskBulkCreateSerializer,
+    TaskCreateSerializer,
+    UserSerializer,
+)
+from .services import TagService, TaskService, UserService
+from .views import json_response
+
+
+@sync_to_async
+@transaction.atomic
+def _write(telegram_id, handler, data, create_user=True):
+    user = views.get_user(telegram_id) if create_user else views.get_user_ref(telegram_id)
+    return handler(user, data)
+
+
+@csrf_exempt
+@rate_limit("register")
+@json_response
+async def register(request):
+    serializer = RegisterSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    telegram_id = serializer.validated_data["telegram_id"]
+    username = serializer.validated_data.get("username") or ""
+    user, _ = await User.objects.aget_or_create(telegram_id=telegram_id, defaults={"username": username})
+    if username and user.username != username:
+        user.username = username
+        await user.asave(update_fields=["username"])
+
+    await sync_to_async(UserService.remember_user)(telegram_id)
+    return JsonResponse(UserSerializer(user).data)
+
+
+@csrf_exempt
+@rate_limit("get_tasks")
+@json_response
+async def get_tasks(request):
+    user = views.get_user_ref(request.GET["telegram_id"])
+    return FastJsonResponse({"tasks": await TaskService.aget_pending_task_rows_for_user(user)})
+
+
+@csrf_exempt
+@rate_limit("create_task")
+@json_response
+async def create_task(request):
+    serializer = TaskCreateSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._create_task, data))
+
+
+@csrf_exempt
+@rate_limit("bulk_create_tasks")
+@json_response
+async def bulk_create_tasks(request):
+    serializer = TaskBulkCreateSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._bulk_create_tasks, data))
+
+
+@csrf_exempt
+@rate_limit("get_tags")
+@json_response
+async def get_tags(request):
+    user = views.get_user_ref(request.GET["telegram_id"])
+    tags = await TagService.aget_tags_for_user(user)
+    return JsonResponse({"tags": TagSerializer(tags, many=True).data})
+
+
+@csrf_exempt
+@rate_limit("create_tag")
+@json_response
+async def create_tag(request):
+    serializer = TagCreateSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._create_tag, data))
+
+
+@csrf_exempt
+@rate_limit("get_archive")
+@json_response
+async def get_archive(request):
+    user = views.get_user_ref(request.GET["telegram_id"])
+    return FastJsonResponse(await TaskService.aget_archive_page_for_user(user, request.GET.get("cursor")))
+
+
+@csrf_exempt
+@rate_limit("complete_task")
+@json_response
+async def complete_task(request):
+    serializer = TaskActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._complete_task, data, create_user=False))
+
+
+@csrf_exempt
+@rate_limit("delete_task")
+@json_response
+async def delete_task(request):
+    serializer = TaskActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._delete_task, data, create_user=False))
+
+
+@csrf_exempt
+@rate_limit("bulk_complete_tasks")
+@json_response
+async def bulk_complete_tasks(request):
+    serializer = TaskBulkActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._complete_tasks, data, create_user=False))
+
+
+@csrf_exempt
+@rate_limit("bulk_delete_tasks")
+@json_response
+async def bulk_delete_tasks(request):
+    serializer = TaskBulkActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._delete_tasks, data, create_user=False))
+
+
+@csrf_exempt
+@rate_limit("delete_tag")
+@json_response
+async def delete_tag(request):
+    serializer = TagActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._delete_tag, data, create_user=False))
+
+
+@csrf_exempt
+@rate_limit("clear_all")
+@json_response
+async def clear_all(request):
+    serializer = ClearAllSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    data = serializer.validated_data
+    return JsonResponse(await _write(data["telegram_id"], views._clear_all, data, create_user=False))
+
+
+# Batches are one transaction end to end; Django runs these sync views in a thread under ASGI
+batch = views.batch
+notify = views.notify
@@ -0,0 +1,120 @@
+"""
+Prometheus metrics of the backend: API requests, their DB usage, the
+per-user cache and reminder delivery.
+
+Under gunicorn or prefork Celery each process keeps its own values. Set
+PROMETHEUS_MULTIPROC_DIR (an empty directory shared by the processes) to
+have /metrics report the sum over all of them.
+"""
+
+import os
+import shutil
+import time
+from contextvars import ContextVar
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+
+CACHE_REQUESTS = Counter(
+    "api_cache_requests_total",
+    "Per-user list cache lookups",
+    ["name", "result"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "api_cache_invalidations_total",
+    "Per-user list cache invalidations (version bumps)",
+)
+API_KEY_REQUESTS = Counter(
+    "api_key_requests_total",
+    "API requests by API key name ('invalid' for rejected ones)",
+    ["key"],
+)
+
+REQUESTS = Counter(
+    "api_requests_total",
+    "API requests by route and response status",
+    ["route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "Time spent in the middleware stack and view",
+    ["route", "method"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "api_request_db_queries",
+    "Database queries run by one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, float("inf")),
+)
+REQUEST_DB_TIME = Histogram(
+    "api_request_db_seconds",
+    "Time one request spent in database queries",
+    ["route"],
+)
+
+NOTIFICATIONS_SENT = Counter(
+    "notifications_sent_total",
+    "Reminder messages sent to the Telegram Bot API",
+    ["result"],
+)
+NOTIFICATION_SEND_LATENCY = Histogram(
+    "notification_send_seconds",
+    "Time to send one reminder, retries and rate limit waits included",
+)
+
+# [queries, seconds] of the request being served, or None outside requests
+_request_db: ContextVar[list | None] = ContextVar("request_db", default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's totals"""
+    totals = _request_db.get()
+    if totals is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        totals[0] += 1
+        totals[1] += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver: count queries on every new DB connection"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def start_request():
+    """Start collecting DB totals for a request; returns the token for finish_request"""
+    return _request_db.set([0, 0.0])
+
+
+def finish_request(token, route, method, status, started):
+    queries, db_seconds = _request_db.get() or [0, 0.0]
+    _request_db.reset(token)
+    REQUESTS.labels(route=route, method=method, status=status).inc()
+    REQUEST_LATENCY.labels(route=route, method=method).observe(time.perf_counter() - started)
+    REQUEST_DB_QUERIES.labels(route=route).observe(queries)
+    REQUEST_DB_TIME.labels(route=route).observe(db_seconds)
+
+
+def metrics_registry():
+    """Registry to export: this process, or every process in multiprocess mode"""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def reset_multiprocess_dir():
+    """Empty PROMETHEUS_MULTIPROC_DIR before the first process starts writing to it"""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def mark_process_dead(pid: int):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
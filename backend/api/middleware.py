@@ -1,21 +1,149 @@
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
 from django.http import JsonResponse
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import API_KEY_REQUESTS, finish_request, start_request
+
+API_PATH_PREFIX = "/api/"
+
+
+class MetricsMiddleware:
+    """
+    Records request count, latency and DB queries per route (api/metrics.py).
+    Goes first in MIDDLEWARE so the whole stack is timed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        token, started = start_request(), time.perf_counter()
+        response = self.get_response(request)
+        self.finish(request, response, token, started)
+        return response
+
+    async def __acall__(self, request):
+        token, started = start_request(), time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(request, response, token, started)
+        return response
+
+    def finish(self, request, response, token, started):
+        route = request.resolver_match.route if request.resolver_match else "unmatched"
+        finish_request(token, route, request.method, response.status_code, started)
+
+
+def hash_api_key(api_key: str) -> bytes:
+    return hashlib.sha256(api_key.encode()).digest()
 
 
 class APIKeyMiddleware:
     """
     Middleware to validate API key in request headers.
+    Works in both sync (WSGI) and async (ASGI) middleware chains.
+
+    Keys are only held as SHA-256 digests, mapped to their names. The header
+    is hashed and looked up in that map, so the time taken doesn't depend on
+    how much of a real key the caller guessed, and no request touches the DB.
     """
 
+    sync_capable = True
+    async_capable = True
+    exempt_prefixes = ("/admin/", "/static/", "/metrics")
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        self.key_names = {bytes.fromhex(digest): name for name, digest in settings.API_KEY_HASHES.items()}
+        if settings.API_KEY:
+            self.key_names[hash_api_key(settings.API_KEY)] = "default"
+        self.key_requests = {name: API_KEY_REQUESTS.labels(key=name) for name in self.key_names.values()}
+        self.rejected_requests = API_KEY_REQUESTS.labels(key="invalid")
 
     def __call__(self, request):
-        if request.path.startswith("/admin/") or request.path.startswith("/static/"):
-            return self.get_response(request)
+        if self.async_mode:
+            return self.__acall__(request)
+
+        denied = self.check(request)
+        if denied is not None:
+            return denied
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        denied = self.check(request)
+        if denied is not None:
+            return denied
+        return await self.get_response(request)
+
+    def check(self, request):
+        """Return an error response if the request must be rejected"""
+        if request.path.startswith(self.exempt_prefixes):
+            return None
 
         api_key = request.headers.get("X-API-Key")
-        if not api_key or api_key != settings.API_KEY:
+        name = self.key_names.get(hash_api_key(api_key)) if api_key else None
+        if name is None:
+            self.rejected_requests.inc()
             return JsonResponse({"error": "Invalid API key"}, status=401)
 
-        return self.get_response(request)
+        request.api_key_name = name
+        self.key_requests[name].inc()
+        return None
+
+
+class SkipForAPIMixin(MiddlewareMixin):
+    """
+    Pass /api/ requests straight to the next middleware. The API is
+    authenticated by APIKeyMiddleware and never uses sessions, users,
+    messages, CSRF tokens or frames; /admin/ still gets the full stack.
+    """
+
+    def __call__(self, request):
+        if request.path.startswith(API_PATH_PREFIX):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SiteSessionMiddleware(SkipForAPIMixin, SessionMiddleware):
+    pass
+
+
+class SiteCsrfViewMiddleware(SkipForAPIMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # Django calls view hooks directly, not through __call__
+        if request.path.startswith(API_PATH_PREFIX):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class SiteAuthenticationMiddleware(SkipForAPIMixin, AuthenticationMiddleware):
+    pass
+
+
+class SiteMessageMiddleware(SkipForAPIMixin, MessageMiddleware):
+    pass
+
+
+class SiteXFrameOptionsMiddleware(SkipForAPIMixin, XFrameOptionsMiddleware):
+    pass
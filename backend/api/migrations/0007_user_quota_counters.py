@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model("api", "User")
+    Task = apps.get_model("api", "Task")
+    Tag = apps.get_model("api", "Tag")
+
+    pending = Task.objects.filter(user=OuterRef("pk"), status="pending").values("user").annotate(n=Count("id")).values("n")
+    tags = Tag.objects.filter(user=OuterRef("pk")).values("user").annotate(n=Count("id")).values("n")
+    User.objects.update(pending_tasks_count=Coalesce(Subquery(pending), 0), tags_count=Coalesce(Subquery(tags), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_alter_tag_options_alter_task_options_alter_tag_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="pending_tasks_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="tags_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_user_quota_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="tasks_archive_idx"),
+        ),
+    ]
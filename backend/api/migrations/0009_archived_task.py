@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_task_archive_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTask",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=200)),
+                ("status", models.CharField(max_length=10)),
+                ("created_at", models.DateTimeField()),
+                ("due_date", models.DateTimeField(blank=True, null=True)),
+                ("tag_names", models.JSONField(default=list)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="archived_tasks", to="api.user"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "archived_tasks",
+                "ordering": ["-created_at", "-id"],
+                "indexes": [models.Index(fields=["user", "-created_at", "-id"], name="archived_tasks_user_idx")],
+            },
+        ),
+    ]
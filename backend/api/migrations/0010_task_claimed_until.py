@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_archived_task"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
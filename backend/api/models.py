@@ -4,6 +4,9 @@ from django.db import models
 class User(models.Model):
     telegram_id = models.BigIntegerField(unique=True, primary_key=True)
     username = models.CharField(max_length=100, blank=True)
+    # Denormalized quota counters, kept in step by the service layer
+    pending_tasks_count = models.PositiveIntegerField(default=0)
+    tags_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = "users"
@@ -33,6 +36,8 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     due_date = models.DateTimeField(null=True, blank=True)
     notified = models.BooleanField(default=False)
+    # Lease taken by a reminder run while it talks to the Bot API; other runs skip the task until then
+    claimed_until = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "tasks"
@@ -40,7 +45,32 @@ class Task(models.Model):
         indexes = [
             models.Index(fields=["user", "status"]),
             models.Index(fields=["status", "due_date", "notified"]),
+            # Archive keyset pagination: WHERE user = ? AND (created_at, id) < cursor ORDER BY created_at DESC, id DESC.
+            # Not partial: SQLite can't match a status condition against a bound parameter, and the scan
+            # skips at most MAX_PENDING_TASKS_PER_USER pending rows anyway.
+            models.Index(fields=["user", "-created_at", "-id"], name="tasks_archive_idx"),
         ]
 
     def __str__(self):
         return f"{self.title} ({self.status})"
+
+
+class ArchivedTask(models.Model):
+    """Finished task moved out of `tasks` by the compaction job; keeps the original id"""
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_tasks")
+    title = models.CharField(max_length=200)
+    status = models.CharField(max_length=10)
+    created_at = models.DateTimeField()
+    due_date = models.DateTimeField(null=True, blank=True)
+    tag_names = models.JSONField(default=list)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "archived_tasks"
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["user", "-created_at", "-id"], name="archived_tasks_user_idx")]
+
+    def __str__(self):
+        return f"{self.title} ({self.status}, archived)"
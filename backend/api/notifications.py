@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import NOTIFICATION_SEND_LATENCY, NOTIFICATIONS_SENT
+
+# Bot API answers for one chat or message that retrying can't fix: 400 (chat not found,
+# message too long, ...) and 403 (bot blocked, user deactivated). Others may be transient.
+PERMANENT_ERROR_STATUSES = {400, 403}
+
+DELIVERED, FAILED, REJECTED = "delivered", "failed", "rejected"
+
+
+class RateLimiter:
+    """Spaces calls at least `interval` seconds apart across threads"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds` (used on 429 responses)"""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class TelegramSender:
+    """
+    Sends Telegram messages concurrently over one pooled HTTP session.
+
+    Keeps under the Bot API's global and per-chat rate limits and
+    retries 429 responses after the `retry_after` the API asks for.
+    Each send ends as DELIVERED, FAILED (worth retrying later) or
+    REJECTED (a permanent error for this chat or message).
+    """
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        global_rate: float | None = None,
+        per_chat_interval: float | None = None,
+        max_retries: int | None = None,
+        timeout: float = 5,
+    ):
+        self.concurrency = concurrency or settings.TELEGRAM_SEND_CONCURRENCY
+        self.per_chat_interval = settings.TELEGRAM_PER_CHAT_INTERVAL if per_chat_interval is None else per_chat_interval
+        self.max_retries = settings.TELEGRAM_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter(1 / (global_rate or settings.TELEGRAM_GLOBAL_RATE))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send(self, chat_id, text) -> str:
+        started = time.perf_counter()
+        result = self._send(chat_id, text)
+        NOTIFICATION_SEND_LATENCY.observe(time.perf_counter() - started)
+        NOTIFICATIONS_SENT.labels(result=result).inc()
+        return result
+
+    def _send(self, chat_id, text) -> str:
+        url = f"{settings.TELEGRAM_API_URL}/bot{settings.BOT_TOKEN}/sendMessage"
+
+        for _ in range(self.max_retries + 1):
+            self.limiter.wait()
+            try:
+                response = self.session.post(url, json={"chat_id": chat_id, "text": text}, timeout=self.timeout)
+            except requests.RequestException:
+                return FAILED
+
+            if response.status_code in PERMANENT_ERROR_STATUSES:
+                return REJECTED
+            if response.status_code != 429:
+                return DELIVERED if response.ok else FAILED
+
+            retry_after = _retry_after(response)
+            if retry_after > settings.TELEGRAM_MAX_RETRY_AFTER:
+                return FAILED
+            self.limiter.pause(retry_after)
+
+        return FAILED
+
+    def send_many(self, messages) -> tuple[list, list]:
+        """
+        Send (key, chat_id, text) messages, returning the keys that were
+        delivered and the keys the API rejected for good.
+
+        Chats are processed in parallel; messages to the same chat go one
+        after another, `per_chat_interval` seconds apart.
+        """
+        by_chat = defaultdict(list)
+        for key, chat_id, text in messages:
+            by_chat[chat_id].append((key, text))
+        if not by_chat:
+            return [], []
+
+        def send_chat(chat_id, items):
+            results = []
+            for i, (key, text) in enumerate(items):
+                if i and self.per_chat_interval:
+                    time.sleep(self.per_chat_interval)
+                results.append((key, self.send(chat_id, text)))
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(by_chat))) as pool:
+            results = [
+                item for chat_results in pool.map(lambda item: send_chat(*item), by_chat.items()) for item in chat_results
+            ]
+        delivered = [key for key, result in results if result == DELIVERED]
+        rejected = [key for key, result in results if result == REJECTED]
+        return delivered, rejected
+
+
+def _retry_after(response) -> float:
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return 1.0
+
+
+_sender: TelegramSender | None = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> TelegramSender:
+    """Process-wide sender, so the connection pool survives between Celery tasks"""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = TelegramSender()
+        return _sender
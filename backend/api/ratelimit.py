@@ -0,0 +1,191 @@
+"""
+Per-user request limits for the API views.
+
+All traffic comes from the bot container, so limits are keyed by the
+telegram_id in the request rather than by IP. Each endpoint has a sliding
+window configured in settings.RATE_LIMITS ("10/m" = 10 requests per minute).
+
+With RATELIMIT_REDIS_URL set, the window is a Redis sorted set per
+(endpoint, user) and a Lua script trims, counts and records a request in one
+round trip. Without it the window is kept in process memory, which is only
+correct for a single process (tests, local runs).
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+import redis
+import redis.asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] window key; ARGV: limit, window in ms, unique member for this request.
+# Returns 0 if the request is allowed, else milliseconds until a slot frees up.
+# Uses the Redis clock so web workers with skewed clocks share one window.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return 0
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return math.max(tonumber(oldest[2]) + window - now, 1)
+"""
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """'10/m' -> (10, 60000), '100/5m' -> (100, 300000): requests per window in milliseconds"""
+    count, period = rate.split("/")
+    return int(count), int(period[:-1] or 1) * _PERIODS[period[-1]] * 1000
+
+
+class RedisSlidingWindow:
+    def __init__(self, url: str):
+        self.url = url
+        self._script = redis.Redis.from_url(url).register_script(SLIDING_WINDOW_SCRIPT)
+        self._async_script: AsyncScript | None = None
+
+    def hit(self, key: str, limit: int, window_ms: int) -> int:
+        return int(self._script(keys=[key], args=[limit, window_ms, uuid.uuid4().hex]))
+
+    async def ahit(self, key: str, limit: int, window_ms: int) -> int:
+        if self._async_script is None:
+            self._async_script = aioredis.Redis.from_url(self.url).register_script(SLIDING_WINDOW_SCRIPT)
+        return int(await self._async_script(keys=[key], args=[limit, window_ms, uuid.uuid4().hex]))
+
+
+class LocalSlidingWindow:
+    def __init__(self):
+        self._hits: defaultdict[str, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window_ms: int) -> int:
+        now = time.monotonic() * 1000
+        with self._lock:
+            hits = self._hits[key]
+            while hits and hits[0] <= now - window_ms:
+                hits.popleft()
+            if len(hits) < limit:
+                hits.append(now)
+                return 0
+            return max(math.ceil(hits[0] + window_ms - now), 1)
+
+    async def ahit(self, key: str, limit: int, window_ms: int) -> int:
+        return self.hit(key, limit, window_ms)
+
+
+_limiters: dict[str, RedisSlidingWindow | LocalSlidingWindow] = {}
+
+
+def get_limiter():
+    url = settings.RATELIMIT_REDIS_URL
+    if url not in _limiters:
+        _limiters[url] = RedisSlidingWindow(url) if url else LocalSlidingWindow()
+    return _limiters[url]
+
+
+def _request_key(group: str, request) -> str:
+    if request.method == "GET":
+        telegram_id = request.GET.get("telegram_id")
+    else:
+        try:
+            telegram_id = json.loads(request.body).get("telegram_id")
+        except (ValueError, AttributeError):
+            telegram_id = None
+    if telegram_id is None:
+        return f"ratelimit:{group}:ip:{request.META.get('REMOTE_ADDR', '')}"
+    return f"ratelimit:{group}:{telegram_id}"
+
+
+def _rate_for(group: str):
+    if not settings.RATELIMIT_ENABLE:
+        return None
+    rate = settings.RATE_LIMITS.get(group)
+    return parse_rate(rate) if rate else None
+
+
+def too_many_requests(retry_after_ms: int):
+    seconds = max(math.ceil(retry_after_ms / 1000), 1)
+    response = JsonResponse({"error": f"Слишком много запросов, повторите через {seconds} с"}, status=429)
+    response["Retry-After"] = str(seconds)
+    return response
+
+
+def _hit(group: str, key: str, rate: tuple[int, int]) -> JsonResponse | None:
+    try:
+        retry_after = get_limiter().hit(key, *rate)
+    except redis.RedisError:
+        logger.warning("Rate limiter unavailable, letting %s through", group, exc_info=True)
+        return None
+    return too_many_requests(retry_after) if retry_after else None
+
+
+def _throttle(group: str, request) -> JsonResponse | None:
+    """429 response if the request is over its group's rate, else None; fails open when Redis is down"""
+    rate = _rate_for(group)
+    return _hit(group, _request_key(group, request), rate) if rate else None
+
+
+def check_rate(group: str, telegram_id: int) -> JsonResponse | None:
+    """Count one `group` request for the user outside the decorator (e.g. a batch operation); 429 response if over"""
+    rate = _rate_for(group)
+    return _hit(group, f"ratelimit:{group}:{telegram_id}", rate) if rate else None
+
+
+async def _athrottle(group: str, request) -> JsonResponse | None:
+    rate = _rate_for(group)
+    if not rate:
+        return None
+    try:
+        retry_after = await get_limiter().ahit(_request_key(group, request), *rate)
+    except redis.RedisError:
+        logger.warning("Rate limiter unavailable, letting %s through", group, exc_info=True)
+        return None
+    return too_many_requests(retry_after) if retry_after else None
+
+
+def rate_limit(group: str):
+    """Limit a view (sync or async) per telegram_id using settings.RATE_LIMITS[group]"""
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                throttled = await _athrottle(group, request)
+                if throttled is not None:
+                    return throttled
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            throttled = _throttle(group, request)
+            if throttled is not None:
+                return throttled
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
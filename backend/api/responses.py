@@ -0,0 +1,11 @@
+from django.http import HttpResponse
+
+import orjson
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse for plain dict/list payloads such as the lean task rows, encoded with orjson"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=orjson.dumps(data), **kwargs)
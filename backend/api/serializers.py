@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.utils import timezone
+
 from rest_framework import serializers
 
 from .models import Tag, Task, User
@@ -34,11 +37,42 @@ class TaskSerializer(serializers.ModelSerializer):
         return task
 
 
-class TaskCreateSerializer(serializers.Serializer):
-    telegram_id = serializers.IntegerField()
+# Columns fetched for the lean list path, in the order serialize_task_rows expects
+TASK_ROW_FIELDS = ("id", "title", "status", "created_at", "due_date")
+
+
+def format_datetime(value):
+    """Render a datetime the same way DRF's DateTimeField does"""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def serialize_task_rows(rows):
+    """Build TaskSerializer-shaped dicts from TASK_ROW_FIELDS tuples followed by their tag names"""
+    return [
+        {
+            "id": task_id,
+            "title": title,
+            "status": status,
+            "created_at": format_datetime(created_at),
+            "due_date": format_datetime(due_date),
+            "tags": tags,
+        }
+        for task_id, title, status, created_at, due_date, tags in rows
+    ]
+
+
+class TaskItemSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=200)
     due_date = serializers.DateTimeField(required=False, allow_null=True)
     tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False, default=[])
+    tag_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=[])
 
     def validate_title(self, value):
         if not value.strip():
@@ -50,6 +84,25 @@ class TaskCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError("Too many tags")
         return value
 
+    def validate_tag_ids(self, value):
+        if len(value) > 4:
+            raise serializers.ValidationError("Too many tags")
+        return value
+
+
+class TaskCreateSerializer(TaskItemSerializer):
+    telegram_id = serializers.IntegerField()
+
+
+class TaskBulkCreateSerializer(serializers.Serializer):
+    telegram_id = serializers.IntegerField()
+    tasks = serializers.ListField(child=TaskItemSerializer(), min_length=1)
+
+    def validate_tasks(self, value):
+        if len(value) > settings.MAX_BULK_CREATE_TASKS:
+            raise serializers.ValidationError(f"Too many tasks (max {settings.MAX_BULK_CREATE_TASKS})")
+        return value
+
 
 class TagCreateSerializer(serializers.Serializer):
     telegram_id = serializers.IntegerField()
@@ -72,10 +125,38 @@ class TaskActionSerializer(serializers.Serializer):
     task_id = serializers.IntegerField()
 
 
+class TaskBulkActionSerializer(serializers.Serializer):
+    telegram_id = serializers.IntegerField()
+    task_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1)
+
+    def validate_task_ids(self, value):
+        if len(value) > settings.MAX_BULK_TASK_IDS:
+            raise serializers.ValidationError(f"Too many tasks (max {settings.MAX_BULK_TASK_IDS})")
+        return value
+
+
 class TagActionSerializer(serializers.Serializer):
     telegram_id = serializers.IntegerField()
     tag_id = serializers.IntegerField()
 
 
+class ArchivePageSerializer(serializers.Serializer):
+    telegram_id = serializers.IntegerField()
+    cursor = serializers.CharField(required=False, allow_blank=True)
+
+
 class ClearAllSerializer(serializers.Serializer):
     telegram_id = serializers.IntegerField()
+
+
+class BatchSerializer(serializers.Serializer):
+    telegram_id = serializers.IntegerField()
+    operations = serializers.ListField(child=serializers.DictField(), min_length=1)
+
+    def validate_operations(self, value):
+        if len(value) > settings.MAX_BATCH_OPERATIONS:
+            raise serializers.ValidationError(f"Too many operations (max {settings.MAX_BATCH_OPERATIONS})")
+        for operation in value:
+            if not isinstance(operation.get("op"), str):
+                raise serializers.ValidationError("Each operation needs an 'op' name")
+        return value
@@ -1,5 +1,6 @@
+from .cache_service import UserCacheService
 from .tag_service import TagService
 from .task_service import TaskService
 from .user_service import UserService
 
-__all__ = ["UserService", "TaskService", "TagService"]
+__all__ = ["UserService", "TaskService", "TagService", "UserCacheService"]
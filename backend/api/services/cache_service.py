@@ -0,0 +1,85 @@
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..metrics import CACHE_INVALIDATIONS, CACHE_REQUESTS
+
+
+class UserCacheService:
+    """
+    Per-user cache for task and tag lists.
+
+    Entries are keyed by the user's version counter, so one bump
+    invalidates every cached list of that user at once. Loaded values are
+    stored only after the enclosing transaction commits, so rows a batch
+    later rolls back are never cached.
+    """
+
+    @staticmethod
+    def _version_key(telegram_id: int) -> str:
+        return f"user:{telegram_id}:version"
+
+    @staticmethod
+    def get_version(telegram_id: int) -> int:
+        key = UserCacheService._version_key(telegram_id)
+        version = cache.get(key)
+        if version is None:
+            # Start from a fresh value so an evicted counter never revives old entries
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key, 0)
+        return version
+
+    @staticmethod
+    def get_or_load(telegram_id: int, name: str, loader):
+        key = f"user:{telegram_id}:{name}:v{UserCacheService.get_version(telegram_id)}"
+        value = cache.get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(name=name, result="hit").inc()
+            return value
+
+        CACHE_REQUESTS.labels(name=name, result="miss").inc()
+        value = loader()
+        transaction.on_commit(partial(cache.set, key, value, settings.USER_CACHE_TTL))
+        return value
+
+    @staticmethod
+    async def aget_version(telegram_id: int) -> int:
+        key = UserCacheService._version_key(telegram_id)
+        version = await cache.aget(key)
+        if version is None:
+            await cache.aadd(key, time.time_ns(), None)
+            version = await cache.aget(key, 0)
+        return version
+
+    @staticmethod
+    async def aget_or_load(telegram_id: int, name: str, loader):
+        """Async get_or_load; `loader` is a coroutine function"""
+        key = f"user:{telegram_id}:{name}:v{await UserCacheService.aget_version(telegram_id)}"
+        value = await cache.aget(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(name=name, result="hit").inc()
+            return value
+
+        CACHE_REQUESTS.labels(name=name, result="miss").inc()
+        value = await loader()
+        # The loader's queries ran on the sync thread's connection, so check for a transaction there
+        await sync_to_async(transaction.on_commit)(partial(cache.set, key, value, settings.USER_CACHE_TTL))
+        return value
+
+    @staticmethod
+    def invalidate(telegram_id: int):
+        """Bump the user's version once the current transaction commits"""
+
+        def bump():
+            key = UserCacheService._version_key(telegram_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), None)
+            CACHE_INVALIDATIONS.inc()
+
+        transaction.on_commit(bump)
@@ -1,30 +1,49 @@
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
 
 from ..models import Tag, User
+from .cache_service import UserCacheService
+from .user_service import UserService
 
 
 class TagService:
     @staticmethod
     def get_tags_for_user(user: User):
-        return Tag.objects.filter(user=user).order_by("name")
+        return UserCacheService.get_or_load(
+            user.telegram_id, "tags", lambda: list(Tag.objects.filter(user=user).order_by("name"))
+        )
 
     @staticmethod
-    def create_tag(user: User, name: str) -> Tag:
-        if Tag.objects.filter(user=user).count() >= settings.MAX_TAGS_PER_USER:
-            raise ValueError(f"Лимит тегов: {settings.MAX_TAGS_PER_USER}")
+    async def aget_tags_for_user(user: User):
+        async def load():
+            return [tag async for tag in Tag.objects.filter(user=user).order_by("name")]
+
+        return await UserCacheService.aget_or_load(user.telegram_id, "tags", load)
 
+    @staticmethod
+    def create_tag(user: User, name: str) -> Tag:
         name = name.strip()
-        if not name:
-            raise ValueError("Name is required")
 
-        if Tag.objects.filter(user=user, name=name).exists():
-            raise ValueError("Tag already exists")
+        with transaction.atomic():
+            if not UserService.take_quota(user.telegram_id, "tags_count", settings.MAX_TAGS_PER_USER):
+                raise ValueError(f"Лимит тегов: {settings.MAX_TAGS_PER_USER}")
+
+            if not name:
+                raise ValueError("Name is required")
+
+            try:
+                tag = Tag.objects.create(user=user, name=name)
+            except IntegrityError:
+                raise ValueError("Tag already exists")
 
-        return Tag.objects.create(user=user, name=name)
+        UserCacheService.invalidate(user.telegram_id)
+        return tag
 
     @staticmethod
     def delete_tag(user: User, tag_id: int):
-        deleted = Tag.objects.filter(id=tag_id, user=user).delete()
-        if deleted[0] == 0:
-            raise Tag.DoesNotExist("Tag not found")
+        with transaction.atomic():
+            deleted = Tag.objects.filter(id=tag_id, user=user).delete()
+            if deleted[0] == 0:
+                raise Tag.DoesNotExist("Tag not found")
+            UserService.release_quota("tags_count", {user.telegram_id: 1})
+        UserCacheService.invalidate(user.telegram_id)
@@ -1,63 +1,313 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils.dateparse import parse_datetime
 
-from ..models import Tag, Task, User
+from ..aggregates import GroupArray
+from ..models import ArchivedTask, Tag, Task, User
+from ..serializers import TASK_ROW_FIELDS, serialize_task_rows
+from .cache_service import UserCacheService
+from .user_service import UserService
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_archive_cursor(created_at: datetime, task_id: int) -> str:
+    """Opaque archive position; a few dozen chars, so it fits Telegram's 64-byte callback_data"""
+    return f"{(created_at - _EPOCH) // timedelta(microseconds=1):x}.{task_id:x}"
+
+
+def decode_archive_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        micros, task_id = (int(part, 16) for part in str(cursor).split("."))
+        return _EPOCH + timedelta(microseconds=micros), task_id
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid cursor")
 
 
 class TaskService:
     @staticmethod
-    def get_pending_tasks_for_user(user: User):
-        return Task.objects.filter(user=user, status="pending").prefetch_related("tags").order_by("due_date", "-created_at")
+    def _pending_tasks_queryset(user: User):
+        return Task.objects.filter(user=user, status="pending").order_by("due_date", "-created_at")
 
     @staticmethod
-    def get_archive_tasks_for_user(user: User):
-        """using limit"""
-        return (
-            Task.objects.filter(user=user, status__in=["completed", "deleted"])
-            .prefetch_related("tags")
-            .order_by("-created_at")[: settings.MAX_ARCHIVE_TASKS_PER_USER]
+    def _after_cursor(queryset, cursor: str | None):
+        """Keyset filter for querysets ordered by -created_at, -id"""
+        if not cursor:
+            return queryset
+        created_at, task_id = decode_archive_cursor(cursor)
+        # The redundant created_at <= bound is what lets the database seek the (user, created_at, id) index
+        return queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=task_id), created_at__lte=created_at
         )
 
     @staticmethod
-    def create_task(user: User, title: str, due_date_str=None, tag_names: list[str] | None = None) -> Task:
-        from datetime import datetime as dt
+    def _archive_tasks_queryset(user: User, cursor: str | None = None):
+        """Newest first, starting after `cursor`; served by tasks_archive_idx"""
+        queryset = Task.objects.filter(user=user, status__in=["completed", "deleted"]).order_by("-created_at", "-id")
+        return TaskService._after_cursor(queryset, cursor)
 
-        if Task.objects.filter(user=user, status="pending").count() >= settings.MAX_PENDING_TASKS_PER_USER:
-            raise ValueError(f"Лимит задач: {settings.MAX_PENDING_TASKS_PER_USER}")
+    @staticmethod
+    def _archive_rows_queryset(user: User, cursor: str | None, limit: int):
+        """
+        Rows of up to `limit` archived tasks after `cursor`, unordered (_archive_page
+        sorts them). The page ids come from tasks_archive_idx first, so tag names
+        are aggregated for the page only
+        """
+        page_ids = TaskService._archive_tasks_queryset(user, cursor).values("id")[:limit]
+        return TaskService._task_rows_queryset(Task.objects.filter(id__in=page_ids).order_by())
 
-        if due_date_str is None:
-            due_date = None
-        elif isinstance(due_date_str, dt):
-            due_date = due_date_str
-        elif isinstance(due_date_str, str):
-            due_date = parse_datetime(due_date_str)
-        else:
-            due_date = None
+    @staticmethod
+    def _cold_archive_rows_queryset(user: User, cursor: str | None = None):
+        """Rows from archived_tasks shaped like _task_rows_queryset's"""
+        queryset = ArchivedTask.objects.filter(user=user).order_by("-created_at", "-id")
+        return TaskService._after_cursor(queryset, cursor).values_list(*TASK_ROW_FIELDS, "tag_names")
+
+    @staticmethod
+    def _archive_page(rows) -> dict:
+        """
+        Merge hot and cold rows (up to page size + 1 from each) into one page
+        and the cursor of the next one
+        """
+        page_size = settings.MAX_ARCHIVE_TASKS_PER_USER
+        rows = sorted(rows, key=lambda row: (row[3], row[0]), reverse=True)
+        next_cursor = None
+        if len(rows) > page_size:
+            task_id, _, _, created_at, *_ = rows[page_size - 1]
+            next_cursor = encode_archive_cursor(created_at, task_id)
+        return {"tasks": serialize_task_rows(rows[:page_size]), "next_cursor": next_cursor}
 
-        task = Task.objects.create(user=user, title=title, due_date=due_date)
+    @staticmethod
+    def _task_rows_queryset(queryset):
+        """One row per task with its tag names aggregated by the database"""
+        return queryset.values_list(*TASK_ROW_FIELDS).annotate(
+            tag_names=GroupArray("tags__name", filter=Q(tags__isnull=False))
+        )
+
+    @staticmethod
+    def _task_rows(queryset):
+        return serialize_task_rows(TaskService._task_rows_queryset(queryset))
+
+    @staticmethod
+    async def _atask_rows(queryset):
+        return serialize_task_rows([row async for row in TaskService._task_rows_queryset(queryset)])
+
+    @staticmethod
+    def get_pending_task_rows_for_user(user: User) -> list[dict]:
+        """Pending tasks as ready-to-encode dicts, cached per user"""
+        return UserCacheService.get_or_load(
+            user.telegram_id, "task_rows:pending", lambda: TaskService._task_rows(TaskService._pending_tasks_queryset(user))
+        )
+
+    @staticmethod
+    def get_archive_page_for_user(user: User, cursor: str | None = None) -> dict:
+        """One archive page: {"tasks": [...], "next_cursor": str | None}; the first page is cached per user"""
+
+        def load():
+            limit = settings.MAX_ARCHIVE_TASKS_PER_USER + 1
+            hot = TaskService._archive_rows_queryset(user, cursor, limit)
+            cold = TaskService._cold_archive_rows_queryset(user, cursor)[:limit]
+            return TaskService._archive_page([*hot, *cold])
+
+        if cursor:
+            return load()
+        return UserCacheService.get_or_load(user.telegram_id, "task_rows:archive_page", load)
+
+    @staticmethod
+    async def aget_pending_task_rows_for_user(user: User) -> list[dict]:
+        return await UserCacheService.aget_or_load(
+            user.telegram_id, "task_rows:pending", lambda: TaskService._atask_rows(TaskService._pending_tasks_queryset(user))
+        )
+
+    @staticmethod
+    async def aget_archive_page_for_user(user: User, cursor: str | None = None) -> dict:
+        async def load():
+            limit = settings.MAX_ARCHIVE_TASKS_PER_USER + 1
+            hot = TaskService._archive_rows_queryset(user, cursor, limit)
+            cold = TaskService._cold_archive_rows_queryset(user, cursor)[:limit]
+            return TaskService._archive_page([row async for row in hot] + [row async for row in cold])
 
-        if tag_names:
-            tags = Tag.objects.filter(user=user, name__in=tag_names)
-            task.tags.set(tags)
+        if cursor:
+            return await load()
+        return await UserCacheService.aget_or_load(user.telegram_id, "task_rows:archive_page", load)
 
+    @staticmethod
+    def _owned_tags(user: User, tag_ids: list[int], tag_names: list[str]) -> dict[int, str]:
+        """Resolve ids and names to the user's tags ({id: name}) in one query; any foreign or missing id is an error"""
+        owned = dict(Tag.objects.filter(Q(id__in=tag_ids) | Q(name__in=tag_names), user=user).values_list("id", "name"))
+        if not owned.keys() >= set(tag_ids):
+            raise ValueError("Tag not found")
+        return owned
+
+    @staticmethod
+    def _parse_due_date(value) -> datetime | None:
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, str):
+            return parse_datetime(value)
+        return None
+
+    @staticmethod
+    def _insert_task_tags(task_tag_ids: list[tuple[int, int]]):
+        """Link new tasks to tags in one INSERT; tags.set() would first read links a new task can't have"""
+        if task_tag_ids:
+            TaskTag = Task.tags.through
+            TaskTag.objects.bulk_create([TaskTag(task_id=task_id, tag_id=tag_id) for task_id, tag_id in task_tag_ids])
+
+    @staticmethod
+    def create_task(
+        user: User, title: str, due_date_str=None, tag_names: list[str] | None = None, tag_ids: list[int] | None = None
+    ) -> Task:
+        due_date = TaskService._parse_due_date(due_date_str)
+        owned_tags = TaskService._owned_tags(user, tag_ids or [], tag_names or []) if tag_ids or tag_names else {}
+
+        with transaction.atomic():
+            if not UserService.take_quota(user.telegram_id, "pending_tasks_count", settings.MAX_PENDING_TASKS_PER_USER):
+                raise ValueError(f"Лимит задач: {settings.MAX_PENDING_TASKS_PER_USER}")
+
+            task = Task.objects.create(user=user, title=title, due_date=due_date)
+            TaskService._insert_task_tags([(task.id, tag_id) for tag_id in sorted(owned_tags)])
+
+        UserCacheService.invalidate(user.telegram_id)
         return task
 
+    @staticmethod
+    def bulk_create_tasks(user: User, items: list[dict]) -> list[tuple]:
+        """
+        Create several tasks ({title, due_date, tags, tag_ids}) at once: one tag
+        lookup, one quota UPDATE, one INSERT for tasks and one for their tags.
+        Returns rows shaped like _task_rows_queryset's, for serialize_task_rows.
+        """
+        all_ids = {tag_id for item in items for tag_id in item.get("tag_ids", [])}
+        all_names = {name for item in items for name in item.get("tags", [])}
+        owned_tags = TaskService._owned_tags(user, list(all_ids), list(all_names)) if all_ids or all_names else {}
+
+        item_tags = []
+        for item in items:
+            wanted_ids, wanted_names = set(item.get("tag_ids", [])), set(item.get("tags", []))
+            item_tags.append(
+                sorted(tag_id for tag_id, name in owned_tags.items() if tag_id in wanted_ids or name in wanted_names)
+            )
+
+        with transaction.atomic():
+            if not UserService.take_quota(
+                user.telegram_id, "pending_tasks_count", settings.MAX_PENDING_TASKS_PER_USER, amount=len(items)
+            ):
+                raise ValueError(f"Лимит задач: {settings.MAX_PENDING_TASKS_PER_USER}")
+
+            tasks = Task.objects.bulk_create(
+                [
+                    Task(user=user, title=item["title"], due_date=TaskService._parse_due_date(item.get("due_date")))
+                    for item in items
+                ]
+            )
+            TaskService._insert_task_tags([(task.id, tag_id) for task, tag_ids in zip(tasks, item_tags) for tag_id in tag_ids])
+
+        UserCacheService.invalidate(user.telegram_id)
+        return [
+            (task.id, task.title, task.status, task.created_at, task.due_date, sorted(owned_tags[t] for t in tag_ids))
+            for task, tag_ids in zip(tasks, item_tags)
+        ]
+
+    @staticmethod
+    def _set_status(user: User, task_id: int, status: str):
+        """Move a task to `status`, giving back the pending quota if it was pending"""
+        with transaction.atomic():
+            if Task.objects.filter(id=task_id, user=user, status="pending").update(status=status):
+                UserService.release_quota("pending_tasks_count", {user.telegram_id: 1})
+            elif not Task.objects.filter(id=task_id, user=user).update(status=status):
+                raise Task.DoesNotExist("Task not found")
+        UserCacheService.invalidate(user.telegram_id)
+
     @staticmethod
     def complete_task(user: User, task_id: int):
         """Mark task as completed"""
-        task = Task.objects.get(id=task_id, user=user)
-        task.status = "completed"
-        task.save(update_fields=["status"])
+        TaskService._set_status(user, task_id, "completed")
 
     @staticmethod
     def delete_task(user: User, task_id: int):
         """Mark task as deleted"""
-        task = Task.objects.get(id=task_id, user=user)
-        task.status = "deleted"
-        task.save(update_fields=["status"])
+        TaskService._set_status(user, task_id, "deleted")
+
+    @staticmethod
+    def _set_status_bulk(user: User, task_ids: list[int], status: str) -> dict[int, bool]:
+        """
+        Move the user's tasks to `status` with one UPDATE, giving back the pending
+        quota of those that were pending. Returns {task_id: found}.
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        with transaction.atomic():
+            current = dict(Task.objects.filter(id__in=task_ids, user=user).select_for_update().values_list("id", "status"))
+            if current:
+                Task.objects.filter(id__in=list(current)).update(status=status)
+                released = sum(1 for old_status in current.values() if old_status == "pending")
+                if released:
+                    UserService.release_quota("pending_tasks_count", {user.telegram_id: released})
+                UserCacheService.invalidate(user.telegram_id)
+        return {task_id: task_id in current for task_id in task_ids}
+
+    @staticmethod
+    def complete_tasks(user: User, task_ids: list[int]) -> dict[int, bool]:
+        """Mark several tasks as completed"""
+        return TaskService._set_status_bulk(user, task_ids, "completed")
+
+    @staticmethod
+    def delete_tasks(user: User, task_ids: list[int]) -> dict[int, bool]:
+        """Mark several tasks as deleted"""
+        return TaskService._set_status_bulk(user, task_ids, "deleted")
 
     @staticmethod
     def clear_all_tasks_and_tags(user: User):
         """Delete everything"""
-        Task.objects.filter(user=user).delete()
-        Tag.objects.filter(user=user).delete()
+        with transaction.atomic():
+            Task.objects.filter(user=user).delete()
+            Tag.objects.filter(user=user).delete()
+            ArchivedTask.objects.filter(user=user).delete()
+            User.objects.filter(telegram_id=user.telegram_id).update(pending_tasks_count=0, tags_count=0)
+        UserCacheService.invalidate(user.telegram_id)
+
+    @staticmethod
+    def compact_archive_batch(cutoff: datetime, limit: int) -> int:
+        """
+        Move up to `limit` finished tasks created before `cutoff` from tasks to
+        archived_tasks, freezing their tag names. Returns how many were moved.
+        """
+        with transaction.atomic():
+            task_ids = list(
+                Task.objects.filter(status__in=["completed", "deleted"], created_at__lt=cutoff)
+                .order_by()
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)[:limit]
+            )
+            if not task_ids:
+                return 0
+
+            rows = list(
+                Task.objects.filter(id__in=task_ids)
+                .values_list("user_id", *TASK_ROW_FIELDS)
+                .annotate(tag_names=GroupArray("tags__name", filter=Q(tags__isnull=False)))
+            )
+            ArchivedTask.objects.bulk_create(
+                [
+                    ArchivedTask(
+                        id=task_id,
+                        user_id=user_id,
+                        title=title,
+                        status=status,
+                        created_at=created_at,
+                        due_date=due_date,
+                        tag_names=tag_names,
+                    )
+                    for user_id, task_id, title, status, created_at, due_date, tag_names in rows
+                ],
+                ignore_conflicts=True,
+            )
+            Task.objects.filter(id__in=task_ids).delete()
+
+            for telegram_id in {row[0] for row in rows}:
+                UserCacheService.invalidate(telegram_id)
+        return len(task_ids)
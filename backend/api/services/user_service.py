@@ -1,8 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Expression, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Greatest
+
 from ..models import User
 
+# telegram_id -> monotonic expiry time, most recently seen last
+_known_users: OrderedDict[int, float] = OrderedDict()
+_known_users_lock = threading.Lock()
+
+
+def _known_user_key(telegram_id: int) -> str:
+    return f"user:{telegram_id}:known"
+
 
 class UserService:
     @staticmethod
     def get_or_create_user(telegram_id: int, username: str = "") -> User:
         user, _ = User.objects.get_or_create(telegram_id=telegram_id, defaults={"username": username})
+        # Only once the row is committed: a rolled-back first write must not leave the id "known"
+        transaction.on_commit(partial(UserService.remember_user, telegram_id))
+        return user
+
+    @staticmethod
+    def get_user_ref(telegram_id: int) -> User:
+        """User instance usable in filters and FKs, without touching the database"""
+        user = User(telegram_id=telegram_id)
+        user._state.adding = False
+        user._state.db = "default"
         return user
+
+    @staticmethod
+    def ensure_user(telegram_id: int) -> User:
+        """Like get_or_create_user, but skips the query for recently seen users"""
+        if UserService.is_known_user(telegram_id):
+            return UserService.get_user_ref(telegram_id)
+        return UserService.get_or_create_user(telegram_id)
+
+    @staticmethod
+    def take_quota(telegram_id: int, field: str, limit: int, amount: int = 1) -> bool:
+        """
+        Add `amount` to a per-user counter unless that would exceed `limit`.
+        One conditional UPDATE, so concurrent callers can't overshoot the limit.
+        """
+        users = User.objects.filter(telegram_id=telegram_id, **{f"{field}__lte": limit - amount})
+        if users.update(**{field: F(field) + amount}):
+            return True
+        if User.objects.filter(telegram_id=telegram_id).exists():
+            return False
+        # Known-user cache outlived the row (e.g. another process rolled back its first write)
+        UserService.forget_user(telegram_id)
+        UserService.get_or_create_user(telegram_id)
+        return bool(users.update(**{field: F(field) + amount}))
+
+    @staticmethod
+    def release_quota(field: str, amounts: dict[int, int]):
+        """Subtract {telegram_id: amount} from a per-user counter, for all users in one UPDATE"""
+        if not amounts:
+            return
+        amount: Expression
+        if len(amounts) == 1:
+            amount = Value(next(iter(amounts.values())), output_field=PositiveIntegerField())
+        else:
+            amount = Case(
+                *(When(telegram_id=telegram_id, then=Value(n)) for telegram_id, n in amounts.items()),
+                default=Value(0),
+                output_field=PositiveIntegerField(),
+            )
+        User.objects.filter(telegram_id__in=amounts).update(**{field: Greatest(F(field) - amount, 0)})
+
+    @staticmethod
+    def is_known_user(telegram_id: int) -> bool:
+        ttl = settings.KNOWN_USER_CACHE_TTL
+        if not ttl:
+            return False
+
+        now = time.monotonic()
+        with _known_users_lock:
+            expires = _known_users.get(telegram_id)
+            if expires is not None and expires > now:
+                _known_users.move_to_end(telegram_id)
+                return True
+
+        if cache.get(_known_user_key(telegram_id)):
+            UserService._remember_locally(telegram_id, now + ttl)
+            return True
+        return False
+
+    @staticmethod
+    def remember_user(telegram_id: int):
+        ttl = settings.KNOWN_USER_CACHE_TTL
+        if not ttl:
+            return
+        UserService._remember_locally(telegram_id, time.monotonic() + ttl)
+        cache.set(_known_user_key(telegram_id), 1, ttl)
+
+    @staticmethod
+    def forget_user(telegram_id: int):
+        with _known_users_lock:
+            _known_users.pop(telegram_id, None)
+        cache.delete(_known_user_key(telegram_id))
+
+    @staticmethod
+    def _remember_locally(telegram_id: int, expires: float):
+        with _known_users_lock:
+            _known_users[telegram_id] = expires
+            _known_users.move_to_end(telegram_id)
+            while len(_known_users) > settings.KNOWN_USER_CACHE_SIZE:
+                _known_users.popitem(last=False)
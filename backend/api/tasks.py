@@ -1,38 +1,133 @@
+from collections import Counter
+from datetime import timedelta
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
-import requests
 from celery import shared_task
 
 from .models import Task
+from .notifications import get_sender
+from .services import TaskService, UserCacheService, UserService
 
 
-def send_telegram_message(chat_id, text):
-    """Send message via Telegram Bot API"""
-    url = f"https://api.telegram.org/bot{settings.BOT_TOKEN}/sendMessage"
+def reminder_text(title):
+    return f"⏰ Напоминание: {title}"
 
-    try:
-        response = requests.post(url, json={"chat_id": chat_id, "text": text}, timeout=5)
-        response.raise_for_status()
-        return True
-    except requests.RequestException:
-        return False
+
+def claim_reminders(task_ids):
+    """
+    Claim the un-notified pending tasks among `task_ids` for one run and
+    return their (task_id, telegram_id, title) rows.
+
+    The claim is a lease in claimed_until, taken in a short transaction:
+    concurrent runs skip claimed rows instead of double-sending, and no row
+    lock is held while the messages go out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # user_id is the telegram_id (User's primary key), so no join is needed
+        rows = list(
+            Task.objects.filter(id__in=task_ids, status="pending", notified=False)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .select_for_update(skip_locked=True)
+            .values_list("id", "user_id", "title")
+        )
+        if rows:
+            claimed_until = now + timedelta(seconds=settings.NOTIFICATION_CLAIM_TTL)
+            Task.objects.filter(id__in=[task_id for task_id, _, _ in rows]).update(claimed_until=claimed_until)
+    return rows
+
+
+def deliver_reminders(rows):
+    """
+    Send reminders for claimed (task_id, telegram_id, title) rows concurrently
+    and mark the delivered tasks with a single conditional UPDATE,
+    giving their pending-task quota back to each user. Tasks whose chat
+    rejected the message for good (bot blocked, chat not found) are marked
+    notified but stay pending, so the poller stops resending them. The
+    claim on the rest is dropped so the next run retries them.
+    """
+    delivered, rejected = get_sender().send_many(
+        [(task_id, telegram_id, reminder_text(title)) for task_id, telegram_id, title in rows]
+    )
+    if delivered:
+        with transaction.atomic():
+            still_pending = Task.objects.filter(id__in=delivered, notified=False, status="pending")
+            per_user = Counter(still_pending.select_for_update().values_list("user_id", flat=True))
+            still_pending.update(notified=True, status="completed", claimed_until=None)
+            UserService.release_quota("pending_tasks_count", per_user)
+        for telegram_id in per_user:
+            UserCacheService.invalidate(telegram_id)
+    if rejected:
+        Task.objects.filter(id__in=rejected, notified=False).update(notified=True, claimed_until=None)
+    failed = {task_id for task_id, _, _ in rows}.difference(delivered, rejected)
+    if failed:
+        Task.objects.filter(id__in=failed).update(claimed_until=None)
+    return delivered
+
+
+@shared_task
+def send_task_notifications(task_ids):
+    """Send reminders for many tasks in one run; the Bot API calls happen outside any transaction"""
+    rows = claim_reminders(task_ids)
+    delivered = deliver_reminders(rows) if rows else []
+    return f"Notified {len(delivered)} of {len(task_ids)} tasks"
 
 
 @shared_task
 def send_task_notification(task_id):
+    return send_task_notifications([task_id])
+
+
+DISPATCH_LOCK_KEY = "notifications:dispatch-lock"
+COMPACTION_LOCK_KEY = "archive:compaction-lock"
+
+
+@shared_task
+def dispatch_due_notifications():
+    """Send every due, un-notified reminder, scanning the due-date index in batches"""
+    lock_timeout = max(int(settings.NOTIFICATION_POLL_INTERVAL * 6), 60)
+    if not cache.add(DISPATCH_LOCK_KEY, 1, lock_timeout):
+        return "Dispatch already running"
+
     try:
-        task = Task.objects.get(id=task_id)
+        now = timezone.now()
+        due = Task.objects.filter(status="pending", notified=False, due_date__lte=now).order_by("due_date", "id")
+        processed = 0
+        last = None
+        while True:
+            batch = due
+            if last is not None:
+                # Keyset pagination, so failed sends don't make us rescan the same rows
+                batch = due.filter(Q(due_date__gt=last[0]) | Q(due_date=last[0], id__gt=last[1]))
+            rows = list(batch.values_list("id", "due_date")[: settings.NOTIFICATION_BATCH_SIZE])
+            if not rows:
+                break
+
+            send_task_notifications([task_id for task_id, _ in rows])
+            processed += len(rows)
+            last = (rows[-1][1], rows[-1][0])
 
-        if task.notified or task.status != "pending":
-            return f"Task {task_id} skipped"
+        return f"Processed {processed} due tasks"
+    finally:
+        cache.delete(DISPATCH_LOCK_KEY)
 
-        if send_telegram_message(task.user.telegram_id, f"⏰ Напоминание: {task.title}"):
-            task.notified = True
-            task.status = "completed"
-            task.save(update_fields=["notified", "status"])
-            return f"Notified task {task_id}"
 
-        return f"Failed to notify task {task_id}"
+@shared_task
+def compact_archive():
+    """Move finished tasks older than ARCHIVE_RETENTION_DAYS to the archived_tasks table"""
+    if not cache.add(COMPACTION_LOCK_KEY, 1, max(int(settings.ARCHIVE_COMPACTION_INTERVAL), 60)):
+        return "Compaction already running"
 
-    except Task.DoesNotExist:
-        return f"Task {task_id} not found"
+    try:
+        cutoff = timezone.now() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+        moved = 0
+        while batch := TaskService.compact_archive_batch(cutoff, settings.ARCHIVE_COMPACTION_BATCH_SIZE):
+            moved += batch
+        return f"Archived {moved} tasks"
+    finally:
+        cache.delete(COMPACTION_LOCK_KEY)
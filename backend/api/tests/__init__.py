@@ -6,4 +6,6 @@ Test modules are organized by functionality:
 - test_services.py: Business logic layer tests
 - test_serializers.py: Serializer validation tests
 - test_views.py: API endpoint integration tests
+- test_tasks.py: Celery task tests (reminder delivery)
+- test_benchmarks.py: Opt-in serialization benchmarks (RUN_BENCHMARKS=1)
 """
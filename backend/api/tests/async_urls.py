@@ -0,0 +1,12 @@
+"""
+URLconf serving the async API views, for tests.
+"""
+
+from django.urls import include, path
+
+from api import async_views
+from api.urls import build_urlpatterns
+
+urlpatterns = [
+    path("api/", include(build_urlpatterns(async_views))),
+]
@@ -0,0 +1,76 @@
+"""
+Serialization benchmarks for the task list endpoints.
+
+Skipped by default; run with:
+    RUN_BENCHMARKS=1 python manage.py test api.tests.test_benchmarks --settings=config.settings_test
+"""
+
+import json
+import os
+import time
+import unittest
+from datetime import timedelta
+
+from django.http import JsonResponse
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Tag, Task, User
+from api.responses import FastJsonResponse
+from api.serializers import TaskSerializer
+from api.services import TaskService
+
+SIZES = (1, 100, 10_000)
+ROUNDS = 5
+
+
+def best_of(func, rounds=ROUNDS):
+    """Fastest wall time of `rounds` calls, and the last result"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+@unittest.skipUnless(os.environ.get("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+class TaskSerializationBenchmark(TestCase):
+    """Compare TaskSerializer + JsonResponse with task rows + FastJsonResponse."""
+
+    def setUp(self):
+        """Set up a user with a handful of tags."""
+        self.user = User.objects.create(telegram_id=123456789)
+        self.tags = [Tag.objects.create(user=self.user, name=f"tag{i}") for i in range(4)]
+
+    def create_tasks(self, count):
+        """Bulk create `count` pending tasks with up to two tags each."""
+        Task.objects.filter(user=self.user).delete()
+        due_date = timezone.now() + timedelta(days=1)
+        tasks = Task.objects.bulk_create(
+            Task(user=self.user, title=f"Task {i}", due_date=due_date if i % 2 else None) for i in range(count)
+        )
+        Task.tags.through.objects.bulk_create(
+            Task.tags.through(task_id=task.id, tag_id=self.tags[(i + j) % len(self.tags)].id)
+            for i, task in enumerate(tasks)
+            for j in range(i % 3)
+        )
+
+    def serializer_response(self):
+        tasks = TaskService._pending_tasks_queryset(self.user).prefetch_related("tags")
+        return JsonResponse({"tasks": TaskSerializer(tasks, many=True).data})
+
+    def rows_response(self):
+        return FastJsonResponse({"tasks": TaskService._task_rows(TaskService._pending_tasks_queryset(self.user))})
+
+    def test_task_list_serialization(self):
+        """Test both paths produce the same payload and report their timings."""
+        print(f"\n{'tasks':>8} {'serializer ms':>14} {'rows ms':>10} {'speedup':>8}")
+        for count in SIZES:
+            self.create_tasks(count)
+
+            serializer_time, expected = best_of(self.serializer_response)
+            rows_time, actual = best_of(self.rows_response)
+
+            self.assertEqual(json.loads(actual.content), json.loads(expected.content))
+            print(f"{count:>8} {serializer_time * 1000:>14.2f} {rows_time * 1000:>10.2f} {serializer_time / rows_time:>7.1f}x")
@@ -0,0 +1,130 @@
+"""
+Per-user rate limiting tests (in-process sliding window).
+"""
+
+import json
+import time
+
+from django.test import Client, TestCase, override_settings
+
+from api import ratelimit
+from api.models import Task, User
+
+
+class ParseRateTest(TestCase):
+    """Test suite for rate strings."""
+
+    def test_parse_rate(self):
+        """Test rates become (count, window in ms)."""
+        self.assertEqual(ratelimit.parse_rate("10/m"), (10, 60_000))
+        self.assertEqual(ratelimit.parse_rate("100/5m"), (100, 300_000))
+        self.assertEqual(ratelimit.parse_rate("1/s"), (1, 1_000))
+
+
+class LocalSlidingWindowTest(TestCase):
+    """Test suite for the in-process sliding window."""
+
+    def test_window_allows_limit_then_reports_retry_after(self):
+        """Test requests past the limit get the time until the oldest one expires."""
+        window = ratelimit.LocalSlidingWindow()
+
+        self.assertEqual([window.hit("k", 2, 60_000) for _ in range(2)], [0, 0])
+        retry_after = window.hit("k", 2, 60_000)
+
+        self.assertGreater(retry_after, 59_000)
+        self.assertLessEqual(retry_after, 60_000)
+        self.assertEqual(window.hit("other", 2, 60_000), 0)
+
+    def test_window_slides(self):
+        """Test hits older than the window no longer count."""
+        window = ratelimit.LocalSlidingWindow()
+
+        self.assertEqual(window.hit("k", 1, 10), 0)
+        time.sleep(0.02)
+        self.assertEqual(window.hit("k", 1, 10), 0)
+
+
+@override_settings(RATELIMIT_ENABLE=True, RATELIMIT_REDIS_URL="", RATE_LIMITS={"get_tasks": "2/m", "create_tag": "1/m"})
+class RateLimitViewTest(TestCase):
+    """Test suite for rate limited views."""
+
+    def setUp(self):
+        """Set up test data."""
+        ratelimit._limiters.clear()
+        self.client = Client(HTTP_X_API_KEY="test-api-key")
+        self.user = User.objects.create(telegram_id=123456789)
+
+    def get_tasks(self, telegram_id):
+        return self.client.get("/api/tasks/", {"telegram_id": telegram_id})
+
+    def test_limit_is_per_telegram_id(self):
+        """Test one user hitting the limit doesn't throttle another."""
+        responses = [self.get_tasks(self.user.telegram_id) for _ in range(3)]
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual(responses[2]["Retry-After"], "60")
+        self.assertIn("Слишком много запросов", responses[2].json()["error"])
+        self.assertEqual(self.get_tasks(987654321).status_code, 200)
+
+    def test_limit_reads_telegram_id_from_json_body(self):
+        """Test POST views are keyed by the telegram_id in the body."""
+        post = lambda telegram_id, name: self.client.post(  # noqa: E731
+            "/api/tags/create/", json.dumps({"telegram_id": telegram_id, "name": name}), content_type="application/json"
+        )
+
+        self.assertEqual(post(self.user.telegram_id, "work").status_code, 200)
+        self.assertEqual(post(self.user.telegram_id, "home").status_code, 429)
+        self.assertEqual(post(987654321, "home").status_code, 200)
+
+    def test_unlisted_views_are_not_limited(self):
+        """Test views without a configured rate are never throttled."""
+        for _ in range(5):
+            response = self.client.get("/api/tags/", {"telegram_id": self.user.telegram_id})
+            self.assertEqual(response.status_code, 200)
+
+
+@override_settings(RATELIMIT_ENABLE=True, RATELIMIT_REDIS_URL="", RATE_LIMITS={"create_task": "2/m", "batch": "30/m"})
+class BatchRateLimitTest(TestCase):
+    """Test suite for limits on operations inside /api/batch/."""
+
+    def setUp(self):
+        """Set up test data."""
+        ratelimit._limiters.clear()
+        self.client = Client(HTTP_X_API_KEY="test-api-key")
+        self.user = User.objects.create(telegram_id=123456789)
+
+    def post(self, url, data):
+        return self.client.post(
+            url, json.dumps({"telegram_id": self.user.telegram_id, **data}), content_type="application/json"
+        )
+
+    def test_batched_ops_count_against_their_endpoint(self):
+        """Test create_task ops in a batch use the create_task limit, and an over-limit batch changes nothing."""
+        batch = {"operations": [{"op": "create_task", "title": f"Task {i}"} for i in range(3)]}
+
+        response = self.post("/api/batch/", batch)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.post("/api/tasks/create/", {"title": "Direct"}).status_code, 429)
+
+
+@override_settings(
+    ROOT_URLCONF="api.tests.async_urls", RATELIMIT_ENABLE=True, RATELIMIT_REDIS_URL="", RATE_LIMITS={"get_tasks": "1/m"}
+)
+class AsyncRateLimitViewTest(TestCase):
+    """Test suite for rate limited async views."""
+
+    def setUp(self):
+        """Set up test data."""
+        ratelimit._limiters.clear()
+        self.headers = {"X-API-Key": "test-api-key"}
+
+    async def test_async_view_is_limited(self):
+        """Test the async views share the same limits."""
+        statuses = [
+            (await self.async_client.get("/api/tasks/", {"telegram_id": 123456789}, headers=self.headers)).status_code
+            for _ in range(2)
+        ]
+
+        self.assertEqual(statuses, [200, 429])
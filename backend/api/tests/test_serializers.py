@@ -2,10 +2,14 @@
 Serializer validation tests.
 """
 
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
 
 from api.models import Tag, Task, User
 from api.serializers import (
+    BatchSerializer,
     ClearAllSerializer,
     RegisterSerializer,
     TagActionSerializer,
@@ -16,6 +20,7 @@ from api.serializers import (
     TaskSerializer,
     UserSerializer,
 )
+from api.services import TaskService
 
 
 class UserSerializerTest(TestCase):
@@ -58,6 +63,26 @@ class TaskSerializerTest(TestCase):
         self.assertIn("created_at", serializer.data)
 
 
+class TaskRowsTest(TestCase):
+    """Test suite for the lean task row serialization."""
+
+    def test_task_rows_match_task_serializer(self):
+        """Test rows render exactly like TaskSerializer, tags and datetimes included."""
+        user = User.objects.create(telegram_id=123456789)
+        work = Tag.objects.create(user=user, name="work")
+        home = Tag.objects.create(user=user, name="home")
+        tagged = Task.objects.create(user=user, title="Tagged", due_date=timezone.now() + timedelta(days=1))
+        tagged.tags.set([work, home])
+        Task.objects.create(user=user, title="Plain")
+
+        with self.assertNumQueries(1):
+            rows = TaskService._task_rows(TaskService._pending_tasks_queryset(user))
+        expected = TaskSerializer(TaskService._pending_tasks_queryset(user).prefetch_related("tags"), many=True).data
+
+        self.assertEqual(rows, [dict(task) for task in expected])
+        self.assertEqual({row["title"]: row["tags"] for row in rows}, {"Tagged": ["home", "work"], "Plain": []})
+
+
 class RegisterSerializerTest(TestCase):
     """Test suite for RegisterSerializer."""
 
@@ -159,3 +184,29 @@ class ClearAllSerializerTest(TestCase):
         serializer = ClearAllSerializer(data=data)
 
         self.assertTrue(serializer.is_valid())
+
+
+class BatchSerializerTest(TestCase):
+    """Test suite for BatchSerializer."""
+
+    def test_batch_serializer_valid(self):
+        """Test BatchSerializer with valid operations."""
+        data = {"telegram_id": 123456789, "operations": [{"op": "list_tags"}, {"op": "list_tasks"}]}
+        serializer = BatchSerializer(data=data)
+
+        self.assertTrue(serializer.is_valid())
+
+    def test_batch_serializer_missing_op(self):
+        """Test BatchSerializer rejects operations without a name."""
+        data = {"telegram_id": 123456789, "operations": [{"title": "Task"}]}
+        serializer = BatchSerializer(data=data)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("operations", serializer.errors)
+
+    def test_batch_serializer_too_many_operations(self):
+        """Test BatchSerializer enforces the operation limit."""
+        data = {"telegram_id": 123456789, "operations": [{"op": "list_tags"}] * 11}
+        serializer = BatchSerializer(data=data)
+
+        self.assertFalse(serializer.is_valid())
@@ -2,10 +2,23 @@
 Service layer tests for UserService, TagService, and TaskService.
 """
 
-from django.test import TestCase
-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api.metrics import CACHE_INVALIDATIONS, CACHE_REQUESTS
 from api.models import Tag, Task, User
-from api.services import TagService, TaskService, UserService
+from api.services import TagService, TaskService, UserCacheService, UserService
+from api.services.task_service import encode_archive_cursor
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
 
 class UserServiceTest(TestCase):
@@ -27,6 +40,59 @@ class UserServiceTest(TestCase):
         self.assertEqual(user1.pk, user2.pk)
         self.assertEqual(User.objects.count(), 1)
 
+    def test_get_user_ref_does_not_query(self):
+        """Test get_user_ref builds a reference without touching the database."""
+        with self.assertNumQueries(0):
+            user = UserService.get_user_ref(123456789)
+
+        self.assertEqual(user.pk, 123456789)
+        self.assertEqual(User.objects.count(), 0)
+
+    @override_settings(KNOWN_USER_CACHE_TTL=60)
+    def test_ensure_user_skips_query_for_known_user(self):
+        """Test ensure_user only creates the row on first sight."""
+        UserService.forget_user(123456789)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserService.ensure_user(123456789)
+
+        with self.assertNumQueries(0):
+            user = UserService.ensure_user(123456789)
+
+        self.assertEqual(user.pk, 123456789)
+        self.assertEqual(User.objects.count(), 1)
+
+    @override_settings(KNOWN_USER_CACHE_TTL=60)
+    def test_deleted_user_is_forgotten(self):
+        """Test deleting a user drops it from the known-user cache."""
+        with self.captureOnCommitCallbacks(execute=True):
+            UserService.ensure_user(123456789)
+
+        User.objects.filter(telegram_id=123456789).delete()
+
+        self.assertFalse(UserService.is_known_user(123456789))
+
+    @override_settings(KNOWN_USER_CACHE_TTL=60)
+    def test_user_is_remembered_only_after_commit(self):
+        """Test a rolled-back first write doesn't mark the user as known."""
+        UserService.forget_user(123456789)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            UserService.ensure_user(123456789)
+
+        self.assertFalse(UserService.is_known_user(123456789))
+        self.assertEqual(len(callbacks), 1)
+
+    @override_settings(KNOWN_USER_CACHE_TTL=60)
+    def test_quota_recreates_user_missing_behind_cache(self):
+        """Test a stale known-user entry with no row gets the row created instead of a limit error."""
+        UserService.remember_user(123456789)
+        self.addCleanup(UserService.forget_user, 123456789)
+
+        task = TaskService.create_task(UserService.ensure_user(123456789), "Task 1")
+
+        self.assertEqual(task.user_id, 123456789)
+        self.assertEqual(User.objects.get(telegram_id=123456789).pending_tasks_count, 1)
+
 
 class TagServiceTest(TestCase):
     """Test suite for TagService."""
@@ -60,6 +126,19 @@ class TagServiceTest(TestCase):
 
         self.assertIn("Лимит тегов", str(cm.exception))
 
+    def test_tags_count_tracks_creates_and_deletes(self):
+        """Test the tag counter follows creates, rejected duplicates and deletes."""
+        tag = TagService.create_tag(self.user, "work")
+        with self.assertRaises(ValueError):
+            TagService.create_tag(self.user, "work")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tags_count, 1)
+
+        TagService.delete_tag(self.user, tag.id)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tags_count, 0)
+
     def test_get_tags_for_user(self):
         """Test getting tags for user."""
         tag1 = TagService.create_tag(self.user, "work")
@@ -109,6 +188,61 @@ class TaskServiceTest(TestCase):
         self.assertEqual(task.tags.count(), 1)
         self.assertEqual(task.tags.first().name, "work")
 
+    def test_create_task_with_tag_ids(self):
+        """Test task creation with tag IDs takes one lookup and one M2M insert."""
+        work = TagService.create_tag(self.user, "work")
+        home = TagService.create_tag(self.user, "home")
+
+        # SELECT tag ids, SAVEPOINT, UPDATE users, INSERT task, INSERT task_tags, RELEASE
+        with self.assertNumQueries(6):
+            task = TaskService.create_task(self.user, "Test task", tag_ids=[work.id, home.id])
+
+        self.assertEqual(set(task.tags.values_list("name", flat=True)), {"work", "home"})
+
+    def test_create_task_rejects_foreign_tag_ids(self):
+        """Test another user's tag can't be attached and no quota is taken."""
+        other = User.objects.create(telegram_id=987654321)
+        foreign_tag = TagService.create_tag(other, "home")
+
+        with self.assertRaises(ValueError):
+            TaskService.create_task(self.user, "Test task", tag_ids=[foreign_tag.id])
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.pending_tasks_count, 0)
+        self.assertFalse(Task.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_tasks(self):
+        """Test bulk creation is one INSERT for tasks and one for tag links."""
+        work = TagService.create_tag(self.user, "work")
+        TagService.create_tag(self.user, "home")
+        items = [
+            {"title": "First", "tag_ids": [work.id]},
+            {"title": "Second", "tags": ["home", "missing"]},
+            {"title": "Third"},
+        ]
+
+        # SELECT tags, SAVEPOINT, UPDATE users, INSERT tasks, INSERT task_tags, RELEASE
+        with self.assertNumQueries(6):
+            rows = TaskService.bulk_create_tasks(self.user, items)
+
+        self.assertEqual([(row[1], row[5]) for row in rows], [("First", ["work"]), ("Second", ["home"]), ("Third", [])])
+        self.assertEqual(
+            {t["title"]: t["tags"] for t in TaskService.get_pending_task_rows_for_user(self.user)},
+            {"First": ["work"], "Second": ["home"], "Third": []},
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.pending_tasks_count, 3)
+
+    def test_bulk_create_tasks_over_quota_creates_nothing(self):
+        """Test a bulk create that doesn't fit the quota is rejected as a whole."""
+        TaskService.create_task(self.user, "Existing")
+        items = [{"title": f"Task {i}"} for i in range(settings.MAX_PENDING_TASKS_PER_USER)]
+
+        with self.assertRaises(ValueError):
+            TaskService.bulk_create_tasks(self.user, items)
+
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 1)
+
     def test_create_task_limit_exceeded(self):
         """Test task creation fails when limit exceeded."""
         for i in range(6):
@@ -119,7 +253,7 @@ class TaskServiceTest(TestCase):
 
         self.assertIn("Лимит задач", str(cm.exception))
 
-    def test_get_pending_tasks_for_user(self):
+    def test_get_pending_task_rows_for_user(self):
         """Test getting pending tasks."""
         task1 = TaskService.create_task(self.user, "Task 1")
         task2 = TaskService.create_task(self.user, "Task 2")
@@ -128,13 +262,11 @@ class TaskServiceTest(TestCase):
         task3 = TaskService.create_task(self.user, "Task 3")
         TaskService.complete_task(self.user, task3.id)
 
-        pending_tasks = TaskService.get_pending_tasks_for_user(self.user)
+        pending_tasks = TaskService.get_pending_task_rows_for_user(self.user)
 
-        self.assertEqual(len(pending_tasks), 2)
-        self.assertIn(task1, pending_tasks)
-        self.assertIn(task2, pending_tasks)
+        self.assertEqual(sorted(t["id"] for t in pending_tasks), [task1.id, task2.id])
 
-    def test_get_archive_tasks_for_user(self):
+    def test_get_archive_page_for_user(self):
         """Test getting archive tasks."""
         task1 = TaskService.create_task(self.user, "Task 1")
         TaskService.complete_task(self.user, task1.id)
@@ -145,10 +277,72 @@ class TaskServiceTest(TestCase):
         # Pending task should not be in archive
         TaskService.create_task(self.user, "Task 3")
 
-        archive_tasks = TaskService.get_archive_tasks_for_user(self.user)
+        archive_tasks = TaskService.get_archive_page_for_user(self.user)["tasks"]
 
         self.assertEqual(len(archive_tasks), 2)
 
+    def test_pending_task_rows_single_query(self):
+        """Test pending rows come with aggregated tag names in one query."""
+        TagService.create_tag(self.user, "work")
+        TagService.create_tag(self.user, "home")
+        TaskService.create_task(self.user, "Tagged", tag_names=["work", "home"])
+        TaskService.create_task(self.user, "Plain")
+
+        with self.assertNumQueries(1):
+            rows = TaskService.get_pending_task_rows_for_user(self.user)
+
+        self.assertEqual({row["title"]: row["tags"] for row in rows}, {"Tagged": ["home", "work"], "Plain": []})
+
+    def test_archive_task_rows_single_query(self):
+        """Test an archive page is one query per table and respects the page size."""
+        TagService.create_tag(self.user, "work")
+        for i in range(6):
+            task = TaskService.create_task(self.user, f"Task {i}", tag_names=["work"])
+            TaskService.complete_task(self.user, task.id)
+
+        # tasks + archived_tasks
+        with self.assertNumQueries(2):
+            rows = TaskService.get_archive_page_for_user(self.user)["tasks"]
+
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(all(row["tags"] == ["work"] for row in rows))
+
+    def test_archive_pages_walk_whole_history(self):
+        """Test following next_cursor visits every archived task once, newest first."""
+        tasks = Task.objects.bulk_create(Task(user=self.user, title=f"Task {i}", status="completed") for i in range(12))
+        # Same timestamp for a run of tasks: the id tie-breaker must keep pages stable
+        Task.objects.filter(id__in=[t.id for t in tasks[3:8]]).update(created_at=tasks[3].created_at)
+
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                page = TaskService.get_archive_page_for_user(self.user, cursor)
+            seen += [row["id"] for row in page["tasks"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            self.assertLess(len(cursor), 40)
+
+        expected = Task.objects.filter(user=self.user).order_by("-created_at", "-id").values_list("id", flat=True)
+        self.assertEqual(seen, list(expected))
+
+    @skipUnless(connection.vendor == "sqlite", "plan text is SQLite's")
+    def test_archive_pages_seek_the_indexes(self):
+        """Test a page after a cursor is a range scan on the archive indexes, not a scan of the user's history."""
+        cursor = encode_archive_cursor(timezone.now(), 1)
+
+        hot_plan = TaskService._archive_rows_queryset(self.user, cursor, 6).explain()
+        cold_plan = TaskService._cold_archive_rows_queryset(self.user, cursor)[:6].explain()
+
+        self.assertIn("USING INDEX tasks_archive_idx (user_id=? AND created_at<?)", hot_plan)
+        self.assertNotIn("TEMP B-TREE", hot_plan)
+        self.assertIn("USING INDEX archived_tasks_user_idx (user_id=? AND created_at<?)", cold_plan)
+
+    def test_archive_invalid_cursor(self):
+        """Test a malformed cursor is rejected as a validation error."""
+        with self.assertRaises(ValueError):
+            TaskService.get_archive_page_for_user(self.user, "not-a-cursor")
+
     def test_complete_task(self):
         """Test task completion."""
         task = TaskService.create_task(self.user, "Test task")
@@ -167,6 +361,55 @@ class TaskServiceTest(TestCase):
         task.refresh_from_db()
         self.assertEqual(task.status, "deleted")
 
+    def test_pending_count_tracks_task_lifecycle(self):
+        """Test the pending counter is released once, whatever finishes the task."""
+        completed = TaskService.create_task(self.user, "Task 1")
+        deleted = TaskService.create_task(self.user, "Task 2")
+
+        TaskService.complete_task(self.user, completed.id)
+        TaskService.delete_task(self.user, deleted.id)
+        TaskService.delete_task(self.user, completed.id)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.pending_tasks_count, 0)
+
+    def test_create_task_quota_is_one_update(self):
+        """Test the quota check is a single conditional UPDATE, not a COUNT."""
+        # SAVEPOINT, UPDATE users, INSERT task, RELEASE
+        with self.assertNumQueries(4):
+            TaskService.create_task(self.user, "Task 1")
+
+    def test_complete_tasks_in_bulk(self):
+        """Test bulk completion is one UPDATE and reports each id."""
+        other = User.objects.create(telegram_id=987654321)
+        first = TaskService.create_task(self.user, "First")
+        second = TaskService.create_task(self.user, "Second")
+        foreign = TaskService.create_task(other, "Foreign")
+
+        # SAVEPOINT, SELECT ... FOR UPDATE, UPDATE tasks, UPDATE users, RELEASE
+        with self.assertNumQueries(5):
+            outcomes = TaskService.complete_tasks(self.user, [first.id, second.id, foreign.id, first.id])
+
+        self.assertEqual(outcomes, {first.id: True, second.id: True, foreign.id: False})
+        self.assertEqual(set(Task.objects.filter(user=self.user).values_list("status", flat=True)), {"completed"})
+        self.assertEqual(Task.objects.get(id=foreign.id).status, "pending")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.pending_tasks_count, 0)
+
+    def test_delete_tasks_releases_only_pending_quota(self):
+        """Test deleting a mix of pending and finished tasks gives back only the pending quota."""
+        done = TaskService.create_task(self.user, "Done")
+        TaskService.complete_task(self.user, done.id)
+        pending = TaskService.create_task(self.user, "Pending")
+        TaskService.create_task(self.user, "Kept")
+
+        TaskService.delete_tasks(self.user, [done.id, pending.id])
+
+        self.assertEqual(Task.objects.get(id=done.id).status, "deleted")
+        self.assertEqual(Task.objects.get(id=pending.id).status, "deleted")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.pending_tasks_count, 1)
+
     def test_clear_all_tasks_and_tags(self):
         """Test clearing all user data."""
         TagService.create_tag(self.user, "work")
@@ -177,3 +420,101 @@ class TaskServiceTest(TestCase):
 
         self.assertEqual(Tag.objects.filter(user=self.user).count(), 0)
         self.assertEqual(Task.objects.filter(user=self.user).count(), 0)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.pending_tasks_count, self.user.tags_count), (0, 0))
+
+
+class TaskQuotaConcurrencyTest(TransactionTestCase):
+    """Test quotas hold when many requests create tasks at once."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create(telegram_id=123456789)
+
+    def create_task(self, barrier, i):
+        barrier.wait()
+        try:
+            # The SQLite test database reports lock contention instead of waiting; retry like a client would
+            for _ in range(100):
+                try:
+                    TaskService.create_task(self.user, f"Task {i}")
+                    return "created"
+                except OperationalError:
+                    time.sleep(0.01)
+            return "locked"
+        except ValueError:
+            return "limited"
+        finally:
+            connection.close()
+
+    def test_parallel_creates_respect_limit(self):
+        """Test parallel creates never exceed MAX_PENDING_TASKS_PER_USER."""
+        workers = 20
+        barrier = threading.Barrier(workers)
+        with ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(lambda i: self.create_task(barrier, i), range(workers)))
+
+        limit = settings.MAX_PENDING_TASKS_PER_USER
+        self.assertEqual(results.count("created"), limit)
+        self.assertEqual(results.count("limited"), workers - limit)
+        self.assertEqual(Task.objects.filter(user=self.user, status="pending").count(), limit)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.pending_tasks_count, limit)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserCacheServiceTest(TestCase):
+    """Test suite for the per-user list cache."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create(telegram_id=123456789)
+
+    def test_pending_tasks_served_from_cache(self):
+        """Test repeated reads hit the cache instead of the database."""
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskService.create_task(self.user, "Task 1")
+        hits = CACHE_REQUESTS.labels(name="task_rows:pending", result="hit")._value.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskService.get_pending_task_rows_for_user(self.user)
+        with self.assertNumQueries(0):
+            tasks = TaskService.get_pending_task_rows_for_user(self.user)
+
+        self.assertEqual([t["title"] for t in tasks], ["Task 1"])
+        self.assertEqual(CACHE_REQUESTS.labels(name="task_rows:pending", result="hit")._value.get(), hits + 1)
+
+    def test_writes_invalidate_after_commit(self):
+        """Test writes bump the version once the transaction commits."""
+        self.assertEqual(TagService.get_tags_for_user(self.user), [])
+        invalidations = CACHE_INVALIDATIONS._value.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TagService.create_tag(self.user, "work")
+
+        self.assertEqual([t.name for t in TagService.get_tags_for_user(self.user)], ["work"])
+        self.assertEqual(CACHE_INVALIDATIONS._value.get(), invalidations + 1)
+
+    def test_complete_task_invalidates_both_lists(self):
+        """Test completing a task refreshes pending and archive lists."""
+        with self.captureOnCommitCallbacks(execute=True):
+            task = TaskService.create_task(self.user, "Task 1")
+        self.assertEqual(len(TaskService.get_pending_task_rows_for_user(self.user)), 1)
+        self.assertEqual(len(TaskService.get_archive_page_for_user(self.user)["tasks"]), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskService.complete_task(self.user, task.id)
+
+        self.assertEqual(len(TaskService.get_pending_task_rows_for_user(self.user)), 0)
+        self.assertEqual(len(TaskService.get_archive_page_for_user(self.user)["tasks"]), 1)
+
+    def test_version_is_per_user(self):
+        """Test invalidating one user leaves other users' entries alone."""
+        other = User.objects.create(telegram_id=987654321)
+        version = UserCacheService.get_version(other.telegram_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserCacheService.invalidate(self.user.telegram_id)
+
+        self.assertEqual(UserCacheService.get_version(other.telegram_id), version)
@@ -0,0 +1,365 @@
+"""
+Celery task tests for reminder delivery and archive compaction.
+"""
+
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.metrics import NOTIFICATIONS_SENT
+from api.models import ArchivedTask, Tag, Task, User
+from api.notifications import TelegramSender
+from api.services import TaskService
+from api.tasks import compact_archive, dispatch_due_notifications, send_task_notification, send_task_notifications
+
+
+class FakeBotAPI:
+    """Local stand-in for the Telegram Bot API sendMessage method."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []  # queued (status, body); default is 200 ok
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append((time.monotonic(), payload))
+                status, body = fake.responses.pop(0) if fake.responses else (200, {"ok": True})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def chat_ids(self):
+        return [payload["chat_id"] for _, payload in self.requests]
+
+
+class TelegramSenderTest(TestCase):
+    """Test suite for the batched Telegram sender."""
+
+    def test_send_many_delivers_all_chats(self):
+        """Test every message is sent and its key reported as delivered."""
+        with FakeBotAPI() as api, override_settings(TELEGRAM_API_URL=api.url):
+            sender = TelegramSender(concurrency=4)
+            delivered, rejected = sender.send_many([(1, 10, "a"), (2, 20, "b"), (3, 30, "c")])
+
+        self.assertEqual(sorted(delivered), [1, 2, 3])
+        self.assertEqual(rejected, [])
+        self.assertEqual(sorted(api.chat_ids), [10, 20, 30])
+
+    def test_retries_after_429(self):
+        """Test a 429 is retried after retry_after."""
+        with FakeBotAPI() as api, override_settings(TELEGRAM_API_URL=api.url):
+            api.responses.append((429, {"ok": False, "parameters": {"retry_after": 0.1}}))
+            sender = TelegramSender()
+            self.assertEqual(sender.send(10, "a"), "delivered")
+
+        self.assertEqual(len(api.requests), 2)
+        self.assertGreaterEqual(api.requests[1][0] - api.requests[0][0], 0.1)
+
+    def test_failed_send_not_delivered(self):
+        """Test API errors leave the message undelivered; 400/403 count as rejected, others as failed."""
+        results = ("delivered", "failed", "rejected")
+        sent = {result: NOTIFICATIONS_SENT.labels(result=result)._value.get() for result in results}
+
+        with FakeBotAPI() as api, override_settings(TELEGRAM_API_URL=api.url):
+            api.responses.extend([(500, {"ok": False}), (403, {"ok": False, "description": "bot was blocked by the user"})])
+            delivered, rejected = TelegramSender().send_many([(1, 10, "a"), (2, 10, "b"), (3, 10, "c")])
+
+        self.assertEqual((delivered, rejected), ([3], [2]))
+        for result in results:
+            self.assertEqual(NOTIFICATIONS_SENT.labels(result=result)._value.get(), sent[result] + 1)
+
+    def test_per_chat_interval(self):
+        """Test messages to one chat are spaced apart."""
+        with FakeBotAPI() as api, override_settings(TELEGRAM_API_URL=api.url):
+            TelegramSender(per_chat_interval=0.1).send_many([(1, 10, "a"), (2, 10, "b")])
+
+        self.assertGreaterEqual(api.requests[1][0] - api.requests[0][0], 0.1)
+
+    def test_global_rate(self):
+        """Test the global rate limit spaces messages across chats."""
+        with FakeBotAPI() as api, override_settings(TELEGRAM_API_URL=api.url):
+            TelegramSender(global_rate=20).send_many([(i, i, "a") for i in range(5)])
+
+        times = sorted(t for t, _ in api.requests)
+        self.assertGreaterEqual(times[-1] - times[0], 0.19)
+
+
+class DispatchDueNotificationsTest(TestCase):
+    """Test suite for the due-date polling scheduler."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create(telegram_id=123456789)
+        self.past = timezone.now() - timedelta(minutes=1)
+        self.api = FakeBotAPI().__enter__()
+        self.addCleanup(self.api.__exit__)
+        settings_override = override_settings(TELEGRAM_API_URL=self.api.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_sends_only_due_pending_tasks(self):
+        """Test only due, pending, un-notified tasks are sent."""
+        due = Task.objects.create(user=self.user, title="Due", due_date=self.past)
+        Task.objects.create(user=self.user, title="Future", due_date=timezone.now() + timedelta(hours=1))
+        Task.objects.create(user=self.user, title="Done", due_date=self.past, status="completed")
+        Task.objects.create(user=self.user, title="No date")
+
+        dispatch_due_notifications()
+
+        self.assertEqual(
+            [payload for _, payload in self.api.requests], [{"chat_id": 123456789, "text": "⏰ Напоминание: Due"}]
+        )
+        due.refresh_from_db()
+        self.assertTrue(due.notified)
+        self.assertEqual(due.status, "completed")
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_processes_all_batches(self):
+        """Test every due task is sent across several batches."""
+        for i in range(5):
+            Task.objects.create(user=self.user, title=f"Task {i}", due_date=self.past - timedelta(seconds=i))
+
+        dispatch_due_notifications()
+
+        self.assertEqual(len(self.api.requests), 5)
+        self.assertFalse(Task.objects.filter(notified=False).exists())
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_failed_sends_stay_pending(self):
+        """Test transient failures are retried on the next run, not in a loop, and rejected ones never again."""
+        for i in range(3):
+            Task.objects.create(user=self.user, title=f"Task {i}", due_date=self.past)
+        self.api.responses.extend([(500, {"ok": False})] * 2 + [(403, {"ok": False})])
+
+        dispatch_due_notifications()
+
+        self.assertEqual(len(self.api.requests), 3)
+        self.assertEqual(Task.objects.filter(notified=False, status="pending").count(), 2)
+        self.assertEqual(Task.objects.filter(notified=True, status="pending").count(), 1)
+
+        dispatch_due_notifications()
+
+        self.assertEqual(len(self.api.requests), 5)
+        self.assertEqual(Task.objects.filter(notified=True, status="completed").count(), 2)
+
+    def test_marks_delivered_in_one_update(self):
+        """Test a batch costs one scan, one claim and one UPDATE per table."""
+        for i in range(3):
+            Task.objects.create(user=self.user, title=f"Task {i}", due_date=self.past)
+        User.objects.filter(pk=self.user.pk).update(pending_tasks_count=3)
+
+        # scan, claim (SAVEPOINT, fetch, UPDATE tasks, RELEASE), mark (SAVEPOINT, recheck, UPDATE tasks,
+        # UPDATE users, RELEASE), empty scan
+        with self.assertNumQueries(11):
+            dispatch_due_notifications()
+
+        self.assertEqual(Task.objects.filter(notified=True).count(), 3)
+        self.assertEqual(User.objects.get(pk=self.user.pk).pending_tasks_count, 0)
+
+
+class SendTaskNotificationsTest(TestCase):
+    """Test suite for the bulk notification task."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create(telegram_id=123456789)
+        self.other = User.objects.create(telegram_id=987654321)
+        self.api = FakeBotAPI().__enter__()
+        self.addCleanup(self.api.__exit__)
+        settings_override = override_settings(TELEGRAM_API_URL=self.api.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_sends_many_tasks(self):
+        """Test one run notifies tasks of several users."""
+        tasks = [
+            Task.objects.create(user=self.user, title="Task 1"),
+            Task.objects.create(user=self.user, title="Task 2"),
+            Task.objects.create(user=self.other, title="Task 3"),
+        ]
+        User.objects.filter(pk=self.user.pk).update(pending_tasks_count=2)
+        User.objects.filter(pk=self.other.pk).update(pending_tasks_count=1)
+
+        result = send_task_notifications([t.id for t in tasks])
+
+        self.assertEqual(result, "Notified 3 of 3 tasks")
+        self.assertEqual(sorted(self.api.chat_ids), [123456789, 123456789, 987654321])
+        self.assertEqual(Task.objects.filter(notified=True, status="completed").count(), 3)
+        self.assertEqual(list(User.objects.order_by("pk").values_list("pending_tasks_count", flat=True)), [0, 0])
+
+    def test_skips_notified_and_finished_tasks(self):
+        """Test already notified or non-pending tasks are never resent."""
+        notified = Task.objects.create(user=self.user, title="Notified", notified=True)
+        deleted = Task.objects.create(user=self.user, title="Deleted", status="deleted")
+
+        result = send_task_notifications([notified.id, deleted.id, 999])
+
+        self.assertEqual(result, "Notified 0 of 3 tasks")
+        self.assertEqual(self.api.requests, [])
+
+    def test_task_finished_while_sending_stays_finished(self):
+        """Test the UPDATE only transitions tasks that are still pending."""
+        task = Task.objects.create(user=self.user, title="Task")
+        User.objects.filter(pk=self.user.pk).update(pending_tasks_count=1)
+
+        def delete_during_send(*args, **kwargs):
+            Task.objects.filter(id=task.id).update(status="deleted")
+            return [task.id], []
+
+        with mock.patch("api.notifications.TelegramSender.send_many", side_effect=delete_during_send):
+            send_task_notifications([task.id])
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, "deleted")
+        self.assertFalse(task.notified)
+        self.assertEqual(User.objects.get(pk=self.user.pk).pending_tasks_count, 1)
+
+    def test_claimed_tasks_are_not_sent_twice(self):
+        """Test a run skips tasks another run is still sending, and failed sends give their claim back."""
+        task = Task.objects.create(user=self.user, title="Task")
+        nested = []
+
+        def send_during_send(*args, **kwargs):
+            nested.append(send_task_notifications([task.id]))
+            return [], []
+
+        with mock.patch("api.notifications.TelegramSender.send_many", side_effect=send_during_send):
+            send_task_notifications([task.id])
+
+        self.assertEqual(nested, ["Notified 0 of 1 tasks"])
+        task.refresh_from_db()
+        self.assertIsNone(task.claimed_until)
+        self.assertFalse(task.notified)
+
+    def test_expired_claim_is_sent(self):
+        """Test a claim left by a crashed run stops blocking the task once it expires."""
+        task = Task.objects.create(user=self.user, title="Task")
+        Task.objects.filter(id=task.id).update(claimed_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(send_task_notifications([task.id]), "Notified 1 of 1 tasks")
+
+    def test_single_task_notification(self):
+        """Test the single-task entry point goes through the bulk path."""
+        task = Task.objects.create(user=self.user, title="Task")
+
+        self.assertEqual(send_task_notification(task.id), "Notified 1 of 1 tasks")
+        self.assertEqual(self.api.chat_ids, [123456789])
+
+
+class CreateTaskSchedulingTest(TestCase):
+    """Test suite for reminder scheduling on task creation."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create(telegram_id=123456789)
+        self.data = {
+            "telegram_id": self.user.telegram_id,
+            "title": "Remind me",
+            "due_date": (timezone.now() + timedelta(minutes=5)).isoformat(),
+        }
+
+    def post(self):
+        return self.client.post(
+            "/api/tasks/create/", self.data, content_type="application/json", HTTP_X_API_KEY="test-api-key"
+        )
+
+    @override_settings(NOTIFICATION_MODE="poll")
+    @mock.patch("api.tasks.send_task_notification.apply_async")
+    def test_poll_mode_does_not_schedule_eta(self, apply_async):
+        """Test poll mode leaves reminders to the scheduler."""
+        self.assertEqual(self.post().status_code, 200)
+        apply_async.assert_not_called()
+
+    @override_settings(NOTIFICATION_MODE="eta")
+    @mock.patch("api.tasks.send_task_notification.apply_async")
+    def test_eta_mode_schedules_eta(self, apply_async):
+        """Test eta mode schedules one message per task."""
+        self.assertEqual(self.post().status_code, 200)
+        apply_async.assert_called_once()
+
+
+@override_settings(ARCHIVE_RETENTION_DAYS=30, ARCHIVE_COMPACTION_BATCH_SIZE=2)
+class CompactArchiveTest(TestCase):
+    """Test suite for moving old finished tasks to the cold archive table."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create(telegram_id=123456789)
+        self.old = timezone.now() - timedelta(days=60)
+
+    def create_task(self, title, status, created_at=None):
+        task = Task.objects.create(user=self.user, title=title, status=status)
+        if created_at:
+            Task.objects.filter(id=task.id).update(created_at=created_at)
+        return task
+
+    def test_moves_only_old_finished_tasks(self):
+        """Test old completed/deleted tasks move in batches, everything else stays."""
+        tag = Tag.objects.create(user=self.user, name="work")
+        moved = [self.create_task(f"Old {i}", "completed", self.old + timedelta(minutes=i)) for i in range(3)]
+        moved[0].tags.add(tag)
+        self.create_task("Old deleted", "deleted", self.old)
+        pending = self.create_task("Old pending", "pending", self.old)
+        recent = self.create_task("Recent", "completed")
+
+        result = compact_archive()
+
+        self.assertEqual(result, "Archived 4 tasks")
+        self.assertEqual(set(Task.objects.values_list("id", flat=True)), {pending.id, recent.id})
+        archived = ArchivedTask.objects.get(id=moved[0].id)
+        self.assertEqual((archived.title, archived.tag_names, archived.user_id), ("Old 0", ["work"], self.user.pk))
+        self.assertEqual(archived.created_at, self.old)
+
+    def test_archive_reads_across_both_tables(self):
+        """Test archive pages merge hot and cold tasks in one newest-first order."""
+        for i in range(4):
+            self.create_task(f"Old {i}", "completed", self.old + timedelta(minutes=i))
+        for i in range(3):
+            self.create_task(f"Recent {i}", "deleted")
+        expected = [t["title"] for t in TaskService.get_archive_page_for_user(self.user)["tasks"]]
+
+        compact_archive()
+
+        first = TaskService.get_archive_page_for_user(self.user)
+        second = TaskService.get_archive_page_for_user(self.user, first["next_cursor"])
+        self.assertEqual([t["title"] for t in first["tasks"]], expected)
+        self.assertEqual(
+            [t["title"] for t in first["tasks"] + second["tasks"]],
+            ["Recent 2", "Recent 1", "Recent 0", "Old 3", "Old 2", "Old 1", "Old 0"],
+        )
+        self.assertIsNone(second["next_cursor"])
+
+    def test_clear_all_removes_archived_tasks(self):
+        """Test clearing a user's data also empties the cold archive."""
+        self.create_task("Old", "completed", self.old)
+        compact_archive()
+
+        TaskService.clear_all_tasks_and_tags(self.user)
+
+        self.assertFalse(ArchivedTask.objects.exists())
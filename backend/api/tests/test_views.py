@@ -2,10 +2,15 @@
 API endpoint integration tests.
 """
 
+import hashlib
 import json
 
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
+from api.metrics import API_KEY_REQUESTS, REQUEST_DB_QUERIES, REQUESTS
 from api.models import Tag, Task, User
 
 
@@ -127,6 +132,67 @@ class TaskViewTest(APITestMixin, TestCase):
         task = Task.objects.get(id=response_data["id"])
         self.assertEqual(task.tags.count(), 1)
 
+    def test_create_task_with_tag_ids(self):
+        """Test creating a task with tag IDs."""
+        tag = Tag.objects.create(user=self.user, name="work")
+
+        data = {"telegram_id": self.user.telegram_id, "title": "Task with tag ids", "tag_ids": [tag.id]}
+        response = self.post_json("/api/tasks/create/", data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tags"], ["work"])
+
+    def test_create_task_with_foreign_tag_id(self):
+        """Test another user's tag ID is rejected and nothing is created."""
+        other = User.objects.create(telegram_id=987654321)
+        foreign_tag = Tag.objects.create(user=other, name="home")
+
+        data = {"telegram_id": self.user.telegram_id, "title": "Task", "tag_ids": [foreign_tag.id]}
+        response = self.post_json("/api/tasks/create/", data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Tag not found")
+        self.assertFalse(Task.objects.filter(user=self.user).exists())
+
+    @override_settings(
+        KNOWN_USER_CACHE_TTL=3600, CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_new_user_failed_first_create_then_create(self):
+        """Test a rolled-back first write doesn't leave a new user cached as known without a row."""
+        cache.clear()
+        data = {"telegram_id": 555, "title": "Task", "tag_ids": [999]}
+        self.assertEqual(self.post_json("/api/tasks/create/", data).status_code, 400)
+
+        response = self.post_json("/api/tasks/create/", {"telegram_id": 555, "title": "Task"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(telegram_id=555).pending_tasks_count, 1)
+
+    def test_bulk_create_tasks(self):
+        """Test creating several tasks in one request."""
+        tag = Tag.objects.create(user=self.user, name="work")
+
+        data = {
+            "telegram_id": self.user.telegram_id,
+            "tasks": [{"title": "Buy milk", "tag_ids": [tag.id]}, {"title": "Call mom"}],
+        }
+        response = self.post_json("/api/tasks/bulk_create/", data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(t["title"], t["tags"], t["status"]) for t in response.json()["tasks"]],
+            [("Buy milk", ["work"], "pending"), ("Call mom", [], "pending")],
+        )
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_tasks_validation_error(self):
+        """Test one invalid item rejects the whole request."""
+        data = {"telegram_id": self.user.telegram_id, "tasks": [{"title": "Ok"}, {"title": ""}]}
+        response = self.post_json("/api/tasks/bulk_create/", data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.filter(user=self.user).exists())
+
     def test_get_tasks(self):
         """Test getting user tasks."""
         Task.objects.create(user=self.user, title="Task 1", status="pending")
@@ -139,6 +205,14 @@ class TaskViewTest(APITestMixin, TestCase):
         self.assertIn("tasks", data)
         self.assertEqual(len(data["tasks"]), 2)
 
+    def test_get_tasks_unknown_user(self):
+        """Test reading tasks of an unknown user returns nothing and creates no user."""
+        response = self.get_json("/api/tasks/", {"telegram_id": 555})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tasks"], [])
+        self.assertFalse(User.objects.filter(telegram_id=555).exists())
+
     def test_delete_task(self):
         """Test deleting a task."""
         task = Task.objects.create(user=self.user, title="Test task")
@@ -150,6 +224,36 @@ class TaskViewTest(APITestMixin, TestCase):
         task.refresh_from_db()
         self.assertEqual(task.status, "deleted")
 
+    def test_complete_task(self):
+        """Test completing a task."""
+        task = Task.objects.create(user=self.user, title="Test task")
+        data = {"telegram_id": self.user.telegram_id, "task_id": task.id}
+
+        response = self.post_json("/api/tasks/complete/", data)
+
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual(task.status, "completed")
+
+    def test_bulk_complete_and_delete_tasks(self):
+        """Test bulk status changes return one outcome per id."""
+        first = Task.objects.create(user=self.user, title="First")
+        second = Task.objects.create(user=self.user, title="Second")
+
+        complete = self.post_json(
+            "/api/tasks/bulk_complete/", {"telegram_id": self.user.telegram_id, "task_ids": [first.id, 999999]}
+        )
+        delete = self.post_json("/api/tasks/bulk_delete/", {"telegram_id": self.user.telegram_id, "task_ids": [second.id]})
+
+        self.assertEqual(complete.status_code, 200)
+        self.assertEqual(
+            complete.json()["results"],
+            [{"task_id": first.id, "result": "ok"}, {"task_id": 999999, "result": "not_found"}],
+        )
+        self.assertEqual(delete.json()["results"], [{"task_id": second.id, "result": "ok"}])
+        self.assertEqual(Task.objects.get(id=first.id).status, "completed")
+        self.assertEqual(Task.objects.get(id=second.id).status, "deleted")
+
     def test_get_archive(self):
         """Test getting archive tasks."""
         Task.objects.create(user=self.user, title="Task 1", status="completed")
@@ -162,6 +266,21 @@ class TaskViewTest(APITestMixin, TestCase):
         data = response.json()
         self.assertIn("tasks", data)
         self.assertEqual(len(data["tasks"]), 2)
+        self.assertIsNone(data["next_cursor"])
+
+    def test_get_archive_next_page(self):
+        """Test the archive is paged through next_cursor."""
+        for i in range(7):
+            Task.objects.create(user=self.user, title=f"Task {i}", status="completed")
+
+        first = self.get_json("/api/archive/", {"telegram_id": self.user.telegram_id}).json()
+        second = self.get_json("/api/archive/", {"telegram_id": self.user.telegram_id, "cursor": first["next_cursor"]}).json()
+        invalid = self.get_json("/api/archive/", {"telegram_id": self.user.telegram_id, "cursor": "x"})
+
+        self.assertEqual([t["title"] for t in first["tasks"]], [f"Task {i}" for i in range(6, 1, -1)])
+        self.assertEqual([t["title"] for t in second["tasks"]], ["Task 1", "Task 0"])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(invalid.status_code, 400)
 
     def test_create_task_validation_error(self):
         """Test task creation with empty title fails."""
@@ -188,6 +307,112 @@ class ClearAllViewTest(APITestMixin, TestCase):
         self.assertEqual(Task.objects.filter(user=self.user).count(), 0)
 
 
+class BatchViewTest(APITestMixin, TestCase):
+    """Test suite for batch endpoint."""
+
+    def test_batch_runs_operations_in_order(self):
+        """Test batch returns one result per operation, in order."""
+        tag = Tag.objects.create(user=self.user, name="work")
+        data = {
+            "telegram_id": self.user.telegram_id,
+            "operations": [
+                {"op": "register", "username": "renamed"},
+                {"op": "create_task", "title": "Batched", "tag_ids": [tag.id]},
+                {"op": "list_tasks"},
+            ],
+        }
+        response = self.post_json("/api/batch/", data)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["username"], "renamed")
+        self.assertEqual(results[1]["tags"], ["work"])
+        self.assertEqual([t["title"] for t in results[2]["tasks"]], ["Batched"])
+
+    def test_batch_rolls_back_on_error(self):
+        """Test a failing operation rolls back the whole batch."""
+        data = {
+            "telegram_id": self.user.telegram_id,
+            "operations": [
+                {"op": "create_tag", "name": "work"},
+                {"op": "delete_task", "task_id": 999},
+            ],
+        }
+        response = self.post_json("/api/batch/", data)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_batch_list_archive_follows_cursor(self):
+        """Test list_archive in a batch takes the cursor of the previous page."""
+        for i in range(7):
+            Task.objects.create(user=self.user, title=f"Done {i}", status="completed")
+
+        def list_archive(**op):
+            data = {"telegram_id": self.user.telegram_id, "operations": [{"op": "list_archive", **op}]}
+            return self.post_json("/api/batch/", data).json()["results"][0]
+
+        first = list_archive()
+        second = list_archive(cursor=first["next_cursor"])
+
+        titles = [t["title"] for t in first["tasks"] + second["tasks"]]
+        self.assertEqual(titles, [f"Done {i}" for i in reversed(range(7))])
+        self.assertIsNone(second["next_cursor"])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_rolled_back_batch_leaves_nothing_cached(self):
+        """Test lists read inside a batch that rolls back are not served afterwards."""
+        cache.clear()
+        data = {
+            "telegram_id": self.user.telegram_id,
+            "operations": [
+                {"op": "create_task", "title": "Phantom"},
+                {"op": "list_tasks"},
+                {"op": "delete_task", "task_id": 999},
+            ],
+        }
+        self.assertEqual(self.post_json("/api/batch/", data).status_code, 404)
+
+        response = self.get_json("/api/tasks/", {"telegram_id": self.user.telegram_id})
+
+        self.assertEqual(response.json()["tasks"], [])
+
+    def test_batch_unknown_operation(self):
+        """Test unknown operation names are rejected."""
+        data = {"telegram_id": self.user.telegram_id, "operations": [{"op": "drop_tables"}]}
+        response = self.post_json("/api/batch/", data)
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MetricsViewTest(APITestMixin, TestCase):
+    """Test suite for metrics endpoint."""
+
+    def test_metrics_exposes_cache_counters(self):
+        """Test cache counters are exported in Prometheus format, without an API key."""
+        self.get_json("/api/tasks/", {"telegram_id": self.user.telegram_id})
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"api_cache_requests_total", response.content)
+        self.assertIn(b"api_cache_invalidations_total", response.content)
+        self.assertIn(b'api_request_duration_seconds_count{method="GET",route="api/tasks/"}', response.content)
+
+    def test_request_db_queries_are_recorded(self):
+        """Test each request's DB query count and status are recorded per route."""
+        route = "api/tasks/create/"
+        queries = REQUEST_DB_QUERIES.labels(route=route)._sum.get()
+        requests = REQUESTS.labels(route=route, method="POST", status="200")._value.get()
+
+        with CaptureQueriesContext(connection) as captured:
+            self.post_json("/api/tasks/create/", {"telegram_id": self.user.telegram_id, "title": "Task"})
+
+        self.assertEqual(REQUEST_DB_QUERIES.labels(route=route)._sum.get(), queries + len(captured))
+        self.assertEqual(REQUESTS.labels(route=route, method="POST", status="200")._value.get(), requests + 1)
+
+
 class APIKeyMiddlewareTest(TestCase):
     """Test suite for API key middleware."""
 
@@ -214,3 +439,123 @@ class APIKeyMiddlewareTest(TestCase):
         )
 
         self.assertEqual(response.status_code, 200)
+
+    @override_settings(API_KEY_HASHES={"second-bot": hashlib.sha256(b"second-key").hexdigest()})
+    def test_named_api_keys_are_counted(self):
+        """Test every configured key is accepted and counted under its name."""
+        default_hits = API_KEY_REQUESTS.labels(key="default")._value.get()
+        second_hits = API_KEY_REQUESTS.labels(key="second-bot")._value.get()
+        rejected = API_KEY_REQUESTS.labels(key="invalid")._value.get()
+        params = {"telegram_id": self.user.telegram_id}
+
+        responses = [
+            self.client.get("/api/tags/", params, HTTP_X_API_KEY="test-api-key"),
+            self.client.get("/api/tags/", params, HTTP_X_API_KEY="second-key"),
+            self.client.get("/api/tags/", params, HTTP_X_API_KEY="second-ke"),
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 401])
+        self.assertEqual(API_KEY_REQUESTS.labels(key="default")._value.get(), default_hits + 1)
+        self.assertEqual(API_KEY_REQUESTS.labels(key="second-bot")._value.get(), second_hits + 1)
+        self.assertEqual(API_KEY_REQUESTS.labels(key="invalid")._value.get(), rejected + 1)
+
+
+class SiteMiddlewareTest(TestCase):
+    """Test suite for the middleware skipped on API requests."""
+
+    def test_api_requests_skip_site_middleware(self):
+        """Test API responses go through none of the session/CSRF/auth/frame middleware."""
+        response = self.client.get("/api/tags/", {"telegram_id": 123456789}, HTTP_X_API_KEY="test-api-key")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+        self.assertFalse(hasattr(response.wsgi_request, "user"))
+        self.assertNotIn("X-Frame-Options", response.headers)
+
+    def test_admin_keeps_full_stack(self):
+        """Test the admin still gets sessions, users and frame protection."""
+        response = self.client.get("/admin/login/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+        self.assertTrue(hasattr(response.wsgi_request, "user"))
+        self.assertEqual(response.headers["X-Frame-Options"], "DENY")
+
+
+@override_settings(ROOT_URLCONF="api.tests.async_urls")
+class AsyncViewTest(TestCase):
+    """Test suite for the async API views."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create(telegram_id=123456789, username="testuser")
+        self.headers = {"X-API-Key": "test-api-key"}
+
+    async def test_get_tasks(self):
+        """Test listing tasks through the async ORM."""
+        tag = await Tag.objects.acreate(user=self.user, name="work")
+        task = await Task.objects.acreate(user=self.user, title="Task 1")
+        await task.tags.aadd(tag)
+
+        response = await self.async_client.get("/api/tasks/", {"telegram_id": self.user.telegram_id}, headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tasks"][0]["tags"], ["work"])
+
+    async def test_get_tags_and_archive(self):
+        """Test tag and archive lists."""
+        await Tag.objects.acreate(user=self.user, name="work")
+        await Task.objects.acreate(user=self.user, title="Done", status="completed")
+
+        tags = await self.async_client.get("/api/tags/", {"telegram_id": self.user.telegram_id}, headers=self.headers)
+        archive = await self.async_client.get("/api/archive/", {"telegram_id": self.user.telegram_id}, headers=self.headers)
+
+        self.assertEqual([t["name"] for t in tags.json()["tags"]], ["work"])
+        self.assertEqual([t["title"] for t in archive.json()["tasks"]], ["Done"])
+
+    async def test_register_new_user(self):
+        """Test registering through aget_or_create."""
+        response = await self.async_client.post(
+            "/api/register/", {"telegram_id": 555, "username": "new"}, content_type="application/json", headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], "new")
+        self.assertTrue(await User.objects.filter(telegram_id=555).aexists())
+
+    async def test_create_and_delete_task(self):
+        """Test writes run in a transaction and return the sync payloads."""
+        created = await self.async_client.post(
+            "/api/tasks/create/",
+            {"telegram_id": self.user.telegram_id, "title": "Task 1"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        deleted = await self.async_client.post(
+            "/api/tasks/delete/",
+            {"telegram_id": self.user.telegram_id, "task_id": created.json()["id"]},
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+        self.assertEqual(created.json()["title"], "Task 1")
+        self.assertEqual(deleted.json(), {"status": "ok"})
+        self.assertEqual((await Task.objects.aget(id=created.json()["id"])).status, "deleted")
+
+    async def test_errors_are_json(self):
+        """Test async views map errors like the sync ones."""
+        response = await self.async_client.post(
+            "/api/tasks/delete/",
+            {"telegram_id": self.user.telegram_id, "task_id": 999},
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "Task not found"})
+
+    async def test_api_key_required(self):
+        """Test the API key middleware runs in async mode."""
+        response = await self.async_client.get("/api/tasks/", {"telegram_id": self.user.telegram_id})
+
+        self.assertEqual(response.status_code, 401)
@@ -1,16 +1,27 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
-urlpatterns = [
-    path("register/", views.register),
-    path("tasks/", views.get_tasks),
-    path("tasks/create/", views.create_task),
-    path("tasks/delete/", views.delete_task),
-    path("archive/", views.get_archive),
-    path("tags/", views.get_tags),
-    path("tags/create/", views.create_tag),
-    path("tags/delete/", views.delete_tag),
-    path("clear/", views.clear_all),
-    path("notify/", views.notify),
-]
+
+def build_urlpatterns(api_views):
+    return [
+        path("register/", api_views.register),
+        path("tasks/", api_views.get_tasks),
+        path("tasks/create/", api_views.create_task),
+        path("tasks/bulk_create/", api_views.bulk_create_tasks),
+        path("tasks/complete/", api_views.complete_task),
+        path("tasks/delete/", api_views.delete_task),
+        path("tasks/bulk_complete/", api_views.bulk_complete_tasks),
+        path("tasks/bulk_delete/", api_views.bulk_delete_tasks),
+        path("archive/", api_views.get_archive),
+        path("tags/", api_views.get_tags),
+        path("tags/create/", api_views.create_tag),
+        path("tags/delete/", api_views.delete_tag),
+        path("clear/", api_views.clear_all),
+        path("batch/", api_views.batch),
+        path("notify/", api_views.notify),
+    ]
+
+
+urlpatterns = build_urlpatterns(async_views if settings.API_ASYNC_VIEWS else views)
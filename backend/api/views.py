@@ -1,90 +1,200 @@
 import json
+import logging
+from collections import defaultdict
 
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from django_ratelimit.decorators import ratelimit
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from rest_framework.exceptions import ValidationError as DRFValidationError
 
 from . import tasks
+from .metrics import metrics_registry
 from .models import Tag, Task, User
+from .ratelimit import check_rate, rate_limit
+from .responses import FastJsonResponse
 from .serializers import (
+    ArchivePageSerializer,
+    BatchSerializer,
     ClearAllSerializer,
     RegisterSerializer,
     TagActionSerializer,
     TagCreateSerializer,
     TagSerializer,
     TaskActionSerializer,
+    TaskBulkActionSerializer,
+    TaskBulkCreateSerializer,
     TaskCreateSerializer,
     TaskSerializer,
     UserSerializer,
+    serialize_task_rows,
 )
 from .services import TagService, TaskService, UserService
 
+logger = logging.getLogger(__name__)
+
+
+def error_response(exc):
+    """Map an exception raised by a view to a JSON error response"""
+    if isinstance(exc, json.JSONDecodeError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if isinstance(exc, (ValidationError, DRFValidationError, ValueError)):
+        return JsonResponse({"error": str(exc)}, status=400)
+    if isinstance(exc, User.DoesNotExist):
+        return JsonResponse({"error": "User not found"}, status=404)
+    if isinstance(exc, Task.DoesNotExist):
+        return JsonResponse({"error": "Task not found"}, status=404)
+    if isinstance(exc, Tag.DoesNotExist):
+        return JsonResponse({"error": "Tag not found"}, status=404)
+
+    logger.exception("Unhandled error in API view", exc_info=exc)
+    return JsonResponse({"error": f"Server error: {str(exc)}"}, status=500)
+
 
 def json_response(func):
-    """Decorator for handling JSON requests and errors"""
+    """Decorator for handling JSON requests and errors (sync and async views)"""
+
+    if iscoroutinefunction(func):
+
+        async def async_wrapper(request, *args, **kwargs):
+            try:
+                return await func(request, *args, **kwargs)
+            except Exception as e:
+                return error_response(e)
+
+        return async_wrapper
 
     def wrapper(request, *args, **kwargs):
         try:
             return func(request, *args, **kwargs)
-        except json.JSONDecodeError:
-            return JsonResponse({"error": "Invalid JSON"}, status=400)
-        except (ValidationError, DRFValidationError) as e:
-            return JsonResponse({"error": str(e)}, status=400)
-        except ValueError as e:
-            return JsonResponse({"error": str(e)}, status=400)
-        except User.DoesNotExist:
-            return JsonResponse({"error": "User not found"}, status=404)
-        except Task.DoesNotExist:
-            return JsonResponse({"error": "Task not found"}, status=404)
-        except Tag.DoesNotExist:
-            return JsonResponse({"error": "Tag not found"}, status=404)
         except Exception as e:
-            import traceback
-
-            traceback.print_exc()
-            return JsonResponse({"error": f"Server error: {str(e)}"}, status=500)
+            return error_response(e)
 
     return wrapper
 
 
 def get_user(telegram_id):
     """Get or create user by telegram_id"""
-    return UserService.get_or_create_user(int(telegram_id))
+    return UserService.ensure_user(int(telegram_id))
+
+
+def get_user_ref(telegram_id):
+    """User for requests that never create rows: no query, no insert"""
+    return UserService.get_user_ref(int(telegram_id))
+
+
+def _register(user, data):
+    username = data.get("username") or ""
+    user = UserService.get_or_create_user(user.telegram_id, username)
+    if username and user.username != username:
+        user.username = username
+        user.save(update_fields=["username"])
+    return UserSerializer(user).data
+
+
+def _create_task(user, data):
+    task = TaskService.create_task(
+        user=user,
+        title=data["title"],
+        due_date_str=data.get("due_date"),
+        tag_names=data.get("tags", []),
+        tag_ids=data.get("tag_ids", []),
+    )
+
+    if task.due_date and settings.NOTIFICATION_MODE == "eta":
+        tasks.send_task_notification.apply_async(args=[task.id], eta=task.due_date)
+
+    return TaskSerializer(task).data
+
+
+def _bulk_create_tasks(user, data):
+    rows = TaskService.bulk_create_tasks(user, data["tasks"])
+
+    if settings.NOTIFICATION_MODE == "eta":
+        # One message per distinct due date rather than one per task
+        task_ids_by_due = defaultdict(list)
+        for task_id, _, _, _, due_date, _ in rows:
+            if due_date:
+                task_ids_by_due[due_date].append(task_id)
+        for due_date, task_ids in task_ids_by_due.items():
+            tasks.send_task_notifications.apply_async(args=[task_ids], eta=due_date)
+
+    return {"tasks": serialize_task_rows(rows)}
+
+
+def _list_tasks(user, data):
+    return {"tasks": TaskService.get_pending_task_rows_for_user(user)}
+
+
+def _list_tags(user, data):
+    return {"tags": TagSerializer(TagService.get_tags_for_user(user), many=True).data}
+
+
+def _list_archive(user, data):
+    return TaskService.get_archive_page_for_user(user, data.get("cursor"))
+
+
+def _create_tag(user, data):
+    return TagSerializer(TagService.create_tag(user=user, name=data["name"])).data
+
+
+def _complete_task(user, data):
+    TaskService.complete_task(user=user, task_id=data["task_id"])
+    return {"status": "ok"}
+
+
+def _delete_task(user, data):
+    TaskService.delete_task(user=user, task_id=data["task_id"])
+    return {"status": "ok"}
+
+
+def _task_outcomes(found: dict[int, bool]):
+    return {"results": [{"task_id": task_id, "result": "ok" if ok else "not_found"} for task_id, ok in found.items()]}
+
+
+def _complete_tasks(user, data):
+    return _task_outcomes(TaskService.complete_tasks(user=user, task_ids=data["task_ids"]))
+
+
+def _delete_tasks(user, data):
+    return _task_outcomes(TaskService.delete_tasks(user=user, task_ids=data["task_ids"]))
+
+
+def _delete_tag(user, data):
+    TagService.delete_tag(user=user, tag_id=data["tag_id"])
+    return {"status": "ok"}
+
+
+def _clear_all(user, data):
+    TaskService.clear_all_tasks_and_tags(user=user)
+    return {"status": "ok"}
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="10/m", method="POST")
+@rate_limit("register")
 @json_response
 def register(request):
     serializer = RegisterSerializer(data=json.loads(request.body))
     serializer.is_valid(raise_exception=True)
 
-    user = get_user(serializer.validated_data["telegram_id"])
-    if serializer.validated_data.get("username"):
-        user.username = serializer.validated_data["username"]
-        user.save()
-
-    user_serializer = UserSerializer(user)
-    return JsonResponse(user_serializer.data)
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_register(user, serializer.validated_data))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="30/m", method="GET")
+@rate_limit("get_tasks")
 @json_response
 def get_tasks(request):
-    user = get_user(request.GET["telegram_id"])
-    tasks = TaskService.get_pending_tasks_for_user(user)
-
-    serializer = TaskSerializer(tasks, many=True)
-    return JsonResponse({"tasks": serializer.data})
+    user = get_user_ref(request.GET["telegram_id"])
+    return FastJsonResponse(_list_tasks(user, {}))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="10/m", method="POST")
+@rate_limit("create_task")
 @json_response
 @transaction.atomic
 def create_task(request):
@@ -92,33 +202,31 @@ def create_task(request):
     serializer.is_valid(raise_exception=True)
 
     user = get_user(serializer.validated_data["telegram_id"])
+    return JsonResponse(_create_task(user, serializer.validated_data))
 
-    task = TaskService.create_task(
-        user=user,
-        title=serializer.validated_data["title"],
-        due_date_str=serializer.validated_data.get("due_date"),
-        tag_names=serializer.validated_data.get("tags", []),
-    )
 
-    if task.due_date:
-        tasks.send_task_notification.apply_async(args=[task.id], eta=task.due_date)
+@csrf_exempt
+@rate_limit("bulk_create_tasks")
+@json_response
+@transaction.atomic
+def bulk_create_tasks(request):
+    serializer = TaskBulkCreateSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
 
-    task_serializer = TaskSerializer(task)
-    return JsonResponse(task_serializer.data)
+    user = get_user(serializer.validated_data["telegram_id"])
+    return JsonResponse(_bulk_create_tasks(user, serializer.validated_data))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="30/m", method="GET")
+@rate_limit("get_tags")
 @json_response
 def get_tags(request):
-    user = get_user(request.GET["telegram_id"])
-    tags = TagService.get_tags_for_user(user)
-    serializer = TagSerializer(tags, many=True)
-    return JsonResponse({"tags": serializer.data})
+    user = get_user_ref(request.GET["telegram_id"])
+    return JsonResponse(_list_tags(user, {}))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="10/m", method="POST")
+@rate_limit("create_tag")
 @json_response
 @transaction.atomic
 def create_tag(request):
@@ -126,73 +234,138 @@ def create_tag(request):
     serializer.is_valid(raise_exception=True)
 
     user = get_user(serializer.validated_data["telegram_id"])
-    tag = TagService.create_tag(user=user, name=serializer.validated_data["name"])
-
-    tag_serializer = TagSerializer(tag)
-    return JsonResponse(tag_serializer.data)
+    return JsonResponse(_create_tag(user, serializer.validated_data))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="20/m", method="GET")
+@rate_limit("get_archive")
 @json_response
 def get_archive(request):
-    user = get_user(request.GET["telegram_id"])
-    tasks = TaskService.get_archive_tasks_for_user(user)
-
-    serializer = TaskSerializer(tasks, many=True)
-    return JsonResponse({"tasks": serializer.data})
+    user = get_user_ref(request.GET["telegram_id"])
+    return FastJsonResponse(_list_archive(user, {"cursor": request.GET.get("cursor")}))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="10/m", method="POST")
+@rate_limit("complete_task")
 @json_response
 @transaction.atomic
 def complete_task(request):
     serializer = TaskActionSerializer(data=json.loads(request.body))
     serializer.is_valid(raise_exception=True)
 
-    user = get_user(serializer.validated_data["telegram_id"])
-    TaskService.complete_task(user=user, task_id=serializer.validated_data["task_id"])
-    return JsonResponse({"status": "ok"})
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_complete_task(user, serializer.validated_data))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="10/m", method="POST")
+@rate_limit("delete_task")
 @json_response
 @transaction.atomic
 def delete_task(request):
     serializer = TaskActionSerializer(data=json.loads(request.body))
     serializer.is_valid(raise_exception=True)
 
-    user = get_user(serializer.validated_data["telegram_id"])
-    TaskService.delete_task(user=user, task_id=serializer.validated_data["task_id"])
-    return JsonResponse({"status": "ok"})
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_delete_task(user, serializer.validated_data))
+
+
+@csrf_exempt
+@rate_limit("bulk_complete_tasks")
+@json_response
+def bulk_complete_tasks(request):
+    serializer = TaskBulkActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_complete_tasks(user, serializer.validated_data))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="10/m", method="POST")
+@rate_limit("bulk_delete_tasks")
+@json_response
+def bulk_delete_tasks(request):
+    serializer = TaskBulkActionSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_delete_tasks(user, serializer.validated_data))
+
+
+@csrf_exempt
+@rate_limit("delete_tag")
 @json_response
 @transaction.atomic
 def delete_tag(request):
     serializer = TagActionSerializer(data=json.loads(request.body))
     serializer.is_valid(raise_exception=True)
 
-    user = get_user(serializer.validated_data["telegram_id"])
-    TagService.delete_tag(user=user, tag_id=serializer.validated_data["tag_id"])
-    return JsonResponse({"status": "ok"})
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_delete_tag(user, serializer.validated_data))
 
 
 @csrf_exempt
-@ratelimit(key="ip", rate="5/m", method="POST")
+@rate_limit("clear_all")
 @json_response
 @transaction.atomic
 def clear_all(request):
     serializer = ClearAllSerializer(data=json.loads(request.body))
     serializer.is_valid(raise_exception=True)
 
-    user = get_user(serializer.validated_data["telegram_id"])
-    TaskService.clear_all_tasks_and_tags(user=user)
-    return JsonResponse({"status": "ok"})
+    user = get_user_ref(serializer.validated_data["telegram_id"])
+    return JsonResponse(_clear_all(user, serializer.validated_data))
+
+
+# op name -> (payload serializer, handler, RATE_LIMITS group); telegram_id is taken from the batch itself
+BATCH_OPERATIONS = {
+    "register": (RegisterSerializer, _register, "register"),
+    "list_tasks": (None, _list_tasks, "get_tasks"),
+    "list_tags": (None, _list_tags, "get_tags"),
+    "list_archive": (ArchivePageSerializer, _list_archive, "get_archive"),
+    "create_task": (TaskCreateSerializer, _create_task, "create_task"),
+    "bulk_create_tasks": (TaskBulkCreateSerializer, _bulk_create_tasks, "bulk_create_tasks"),
+    "create_tag": (TagCreateSerializer, _create_tag, "create_tag"),
+    "complete_task": (TaskActionSerializer, _complete_task, "complete_task"),
+    "delete_task": (TaskActionSerializer, _delete_task, "delete_task"),
+    "complete_tasks": (TaskBulkActionSerializer, _complete_tasks, "bulk_complete_tasks"),
+    "delete_tasks": (TaskBulkActionSerializer, _delete_tasks, "bulk_delete_tasks"),
+    "delete_tag": (TagActionSerializer, _delete_tag, "delete_tag"),
+}
+
+
+@csrf_exempt
+@rate_limit("batch")
+@json_response
+@transaction.atomic
+def batch(request):
+    """Run several operations for one user in a single transaction"""
+    serializer = BatchSerializer(data=json.loads(request.body))
+    serializer.is_valid(raise_exception=True)
+
+    telegram_id = serializer.validated_data["telegram_id"]
+    operations = serializer.validated_data["operations"]
+    for operation in operations:
+        if operation["op"] not in BATCH_OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation['op']}")
+    # Each operation also counts against its own endpoint's limit, so batching can't bypass it
+    for operation in operations:
+        throttled = check_rate(BATCH_OPERATIONS[operation["op"]][2], telegram_id)
+        if throttled is not None:
+            return throttled
+
+    user = get_user(telegram_id)
+    results = []
+    for operation in operations:
+        payload = dict(operation)
+        name = payload.pop("op")
+        op_serializer_class, handler, _ = BATCH_OPERATIONS[name]
+        data = {}
+        if op_serializer_class is not None:
+            op_serializer = op_serializer_class(data={**payload, "telegram_id": telegram_id})
+            op_serializer.is_valid(raise_exception=True)
+            data = op_serializer.validated_data
+        results.append(handler(user, data))
+
+    return JsonResponse({"results": results})
 
 
 @csrf_exempt
@@ -200,3 +373,8 @@ def notify(request):
     """Endpoint для приема уведомлений от Celery"""
     data = json.loads(request.body)
     return JsonResponse({"status": "received"})
+
+
+def metrics(request):
+    """Prometheus metrics (served at /metrics, without an API key)"""
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
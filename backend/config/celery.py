@@ -1,8 +1,33 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 app = Celery("config")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """
+    Serve the worker's Prometheus metrics on CELERY_METRICS_PORT. Tasks run in
+    prefork children, so this needs PROMETHEUS_MULTIPROC_DIR (empty at start).
+    """
+    port = int(os.environ.get("CELERY_METRICS_PORT", "0"))
+    if not port:
+        return
+
+    from prometheus_client import start_http_server
+
+    from api.metrics import metrics_registry
+
+    start_http_server(port, registry=metrics_registry())
+
+
+@worker_process_shutdown.connect
+def forget_worker_process(pid=None, **kwargs):
+    from api.metrics import mark_process_dead
+
+    mark_process_dead(pid or os.getpid())
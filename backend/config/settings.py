@@ -61,18 +61,20 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "api",
-    "django_ratelimit",
     "rest_framework",
 ]
 
+# The Site* classes are the stock Django middleware, skipped for /api/ requests
+# (see api/middleware.py); the admin keeps the full stack.
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "api.middleware.SiteSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.SiteCsrfViewMiddleware",
+    "api.middleware.SiteAuthenticationMiddleware",
+    "api.middleware.SiteMessageMiddleware",
+    "api.middleware.SiteXFrameOptionsMiddleware",
     "api.middleware.APIKeyMiddleware",
 ]
 
@@ -99,6 +101,17 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are reused between requests (and Celery tasks) for DB_CONN_MAX_AGE
+# seconds, or taken from a psycopg connection pool when DB_POOL is enabled.
+DB_POOL = os.environ.get("DB_POOL", "False") == "True"
+
+# Under ASGI (uvicorn workers, async views) each request's sync ORM work runs in a
+# thread of its own, so persistent connections are never reused and pile up until
+# they time out. Connections there are closed after each request; reuse them with DB_POOL.
+ASGI_SERVER = (
+    "uvicorn" in os.environ.get("GUNICORN_WORKER_CLASS", "").lower() or os.environ.get("API_ASYNC_VIEWS", "False") == "True"
+)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -107,9 +120,21 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "postgres"),
         "HOST": os.environ.get("POSTGRES_HOST", "postgres"),
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        # The pool manages connection lifetime itself and requires CONN_MAX_AGE = 0
+        "CONN_MAX_AGE": 0 if DB_POOL or ASGI_SERVER else int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,7 +182,36 @@ CELERY_BROKER_URL = "redis://redis:6379/0"
 CELERY_RESULT_BACKEND = "redis://redis:6379/0"
 CELERY_TIMEZONE = TIME_ZONE
 
-# Cache configuration for django-ratelimit
+# Reminder delivery mode:
+#   "poll" - beat scans the (status, due_date, notified) index for due tasks in batches
+#   "eta"  - one Celery message with eta=due_date per task (held in worker memory)
+NOTIFICATION_MODE = os.environ.get("NOTIFICATION_MODE", "poll")
+NOTIFICATION_POLL_INTERVAL = float(os.environ.get("NOTIFICATION_POLL_INTERVAL", "10"))
+NOTIFICATION_BATCH_SIZE = int(os.environ.get("NOTIFICATION_BATCH_SIZE", "200"))
+# How long a run may hold its claim on a batch before another run may resend it (worker crashed mid-send)
+NOTIFICATION_CLAIM_TTL = int(os.environ.get("NOTIFICATION_CLAIM_TTL", "300"))
+
+# Finished tasks created more than ARCHIVE_RETENTION_DAYS ago are moved from `tasks`
+# to `archived_tasks` every ARCHIVE_COMPACTION_INTERVAL seconds, in batches
+ARCHIVE_RETENTION_DAYS = int(os.environ.get("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_COMPACTION_INTERVAL = float(os.environ.get("ARCHIVE_COMPACTION_INTERVAL", "3600"))
+ARCHIVE_COMPACTION_BATCH_SIZE = int(os.environ.get("ARCHIVE_COMPACTION_BATCH_SIZE", "500"))
+
+CELERY_BEAT_SCHEDULE = {
+    "compact-archive": {
+        "task": "api.tasks.compact_archive",
+        "schedule": ARCHIVE_COMPACTION_INTERVAL,
+        "options": {"expires": ARCHIVE_COMPACTION_INTERVAL},
+    },
+}
+if NOTIFICATION_MODE == "poll":
+    CELERY_BEAT_SCHEDULE["dispatch-due-notifications"] = {
+        "task": "api.tasks.dispatch_due_notifications",
+        "schedule": NOTIFICATION_POLL_INTERVAL,
+        "options": {"expires": NOTIFICATION_POLL_INTERVAL},
+    }
+
+# Cache configuration for per-user task/tag lists
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
@@ -165,15 +219,67 @@ CACHES = {
     }
 }
 
+# Per-user request limits (api/ratelimit.py): view name -> "count/period", period in s/m/h/d.
+# Windows live in Redis; with an empty RATELIMIT_REDIS_URL they are kept per process.
+RATELIMIT_ENABLE = os.environ.get("RATELIMIT_ENABLE", "True") == "True"
+RATELIMIT_REDIS_URL = os.environ.get("RATELIMIT_REDIS_URL", "redis://redis:6379/3")
+RATE_LIMITS = {
+    "register": "10/m",
+    "get_tasks": "30/m",
+    "get_tags": "30/m",
+    "get_archive": "20/m",
+    "create_task": "10/m",
+    "bulk_create_tasks": "10/m",
+    "complete_task": "10/m",
+    "delete_task": "10/m",
+    "bulk_complete_tasks": "10/m",
+    "bulk_delete_tasks": "10/m",
+    "create_tag": "10/m",
+    "delete_tag": "10/m",
+    "clear_all": "5/m",
+    "batch": "30/m",
+}
+
+# Seconds a cached task/tag list lives (writes invalidate it earlier)
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "300"))
+
+# Recently seen telegram_ids skip the user get_or_create (0 disables)
+KNOWN_USER_CACHE_TTL = int(os.environ.get("KNOWN_USER_CACHE_TTL", "3600"))
+KNOWN_USER_CACHE_SIZE = 10000
+
 # Bot token
 import os
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 
-# API key for authentication
+# Telegram Bot API delivery (reminders)
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_SEND_CONCURRENCY = int(os.environ.get("TELEGRAM_SEND_CONCURRENCY", "8"))
+TELEGRAM_GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "25"))  # messages per second
+TELEGRAM_PER_CHAT_INTERVAL = float(os.environ.get("TELEGRAM_PER_CHAT_INTERVAL", "1"))  # seconds
+TELEGRAM_MAX_RETRIES = 3
+TELEGRAM_MAX_RETRY_AFTER = 30  # give up instead of blocking the worker longer
+
+# API key for authentication (the bot's key, named "default")
 API_KEY = os.environ.get("API_KEY", "12345")
 
+# More named keys, e.g. for rotation or several bot instances, stored as SHA-256 hex digests:
+# API_KEY_HASHES="bot2:<sha256 hex>,old:<sha256 hex>"
+API_KEY_HASHES = dict(item.split(":", 1) for item in os.environ.get("API_KEY_HASHES", "").split(",") if item)
+
 # User limits
 MAX_TAGS_PER_USER = 4
 MAX_PENDING_TASKS_PER_USER = 6
 MAX_ARCHIVE_TASKS_PER_USER = 5
+
+# Serve api/async_views.py instead of api/views.py (use with an ASGI server)
+API_ASYNC_VIEWS = os.environ.get("API_ASYNC_VIEWS", "False") == "True"
+
+# Max operations in one /api/batch/ request
+MAX_BATCH_OPERATIONS = 10
+
+# Max tasks in one /api/tasks/bulk_create/ request (the pending quota still applies)
+MAX_BULK_CREATE_TASKS = 50
+
+# Max task ids in one /api/tasks/bulk_complete/ or bulk_delete/ request
+MAX_BULK_TASK_IDS = 50
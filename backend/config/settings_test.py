@@ -19,23 +19,27 @@ DATABASES = {
 API_KEY = "test-api-key"
 
 # Use dummy cache for tests (faster than Redis)
-# Note: django-ratelimit needs a shared cache, but we disable it in tests
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.dummy.DummyCache",
     }
 }
 
-# Disable rate limiting in tests (required since DummyCache doesn't work with ratelimit)
-RATELIMIT_ENABLE = False
+# Tests create and roll back users freely, so don't remember them between tests
+KNOWN_USER_CACHE_TTL = 0
 
-# Silence django-ratelimit warnings for tests since we disable rate limiting
-SILENCED_SYSTEM_CHECKS = ["django_ratelimit.E003", "django_ratelimit.W001"]
+# Rate limiting is off except in its own tests, which use the in-process window
+RATELIMIT_ENABLE = False
+RATELIMIT_REDIS_URL = ""
 
 # Use eager Celery execution for tests
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# Don't throttle reminder delivery against the fake Bot API
+TELEGRAM_GLOBAL_RATE = 1000
+TELEGRAM_PER_CHAT_INTERVAL = 0
+
 # Test runner configuration
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
 
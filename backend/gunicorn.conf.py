@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration for the backend.
+
+    gunicorn -c gunicorn.conf.py
+
+Every value can be overridden from the environment. The default gthread
+workers serve config.wsgi; setting GUNICORN_WORKER_CLASS to
+uvicorn_worker.UvicornWorker serves config.asgi instead.
+Send SIGHUP to the master for a graceful reload.
+
+With PROMETHEUS_MULTIPROC_DIR set, /metrics sums the metrics of all workers.
+"""
+
+import multiprocessing
+import os
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+wsgi_app = "config.asgi:application" if "uvicorn" in worker_class.lower() else "config.wsgi:application"
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Keep connections from the bot's pooled session open between requests
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "30"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers now and then to cap memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+def on_starting(server):
+    from api.metrics import reset_multiprocess_dir
+
+    reset_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    from api.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
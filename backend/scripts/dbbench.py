@@ -0,0 +1,63 @@
+"""
+Measure the database cost of a request under the current connection settings.
+
+Each iteration goes through Django's request_started/request_finished
+signals, so connections are closed, kept or returned to the pool exactly
+as they are for real requests. Compare, from backend/:
+
+    DB_CONN_MAX_AGE=0 python scripts/dbbench.py     # new connection per request
+    DB_CONN_MAX_AGE=60 python scripts/dbbench.py    # persistent connection
+    DB_POOL=True python scripts/dbbench.py          # psycopg pool
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core import signals  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from api.models import Task  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--telegram-id", type=int, default=1)
+    args = parser.parse_args()
+
+    settings_dict = connection.settings_dict
+    pool = settings_dict.get("OPTIONS", {}).get("pool")
+    print(f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']} pool={pool or 'off'}")
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        request_started = time.perf_counter()
+        signals.request_started.send(sender=None)
+        Task.objects.filter(user_id=args.telegram_id, status="pending").exists()
+        signals.request_finished.send(sender=None)
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"throughput:  {args.requests / elapsed:.1f} req/s (single thread)")
+    print(
+        f"latency ms:  mean {statistics.mean(latencies) * 1000:.2f}  "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.2f}  "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Closed-loop load test for a read endpoint of the API.
+
+Usage (from backend/, against a running server):
+
+    python scripts/loadtest.py --url http://localhost:8000/api/tasks/ --telegram-id 1 \
+        --concurrency 32 --duration 15
+
+Run it once against `manage.py runserver` and once against gunicorn to
+compare throughput and latency percentiles.
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+
+import requests
+
+
+def worker(url, params, headers, deadline, latencies, errors, lock):
+    session = requests.Session()
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=10)
+            if response.status_code >= 400:
+                local_errors += 1
+        except requests.RequestException:
+            local_errors += 1
+        local_latencies.append(time.perf_counter() - started)
+
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/api/tasks/")
+    parser.add_argument("--telegram-id", type=int, default=1)
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY", "12345"))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    params = {"telegram_id": args.telegram_id}
+    headers = {"X-API-Key": args.api_key}
+    latencies: list[float] = []
+    errors: list[int] = []
+    lock = threading.Lock()
+
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args.url, params, headers, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print("No requests completed")
+        return
+
+    latencies.sort()
+    print(f"requests:    {len(latencies)} ({sum(errors)} errors) in {elapsed:.1f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(
+        "latency ms:  "
+        f"mean {statistics.mean(latencies) * 1000:.1f}  "
+        f"p50 {percentile(latencies, 50) * 1000:.1f}  "
+        f"p95 {percentile(latencies, 95) * 1000:.1f}  "
+        f"p99 {percentile(latencies, 99) * 1000:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
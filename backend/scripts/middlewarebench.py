@@ -0,0 +1,82 @@
+"""
+Measure per-request middleware overhead on an API path, with the stock
+Django middleware stack and with the one in settings (Site* middleware
+skipped for /api/). Requests go through the full handler to a view that
+touches neither the database nor the cache. From backend/:
+
+    python scripts/middlewarebench.py
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings_test")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.base import BaseHandler  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+STOCK_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.APIKeyMiddleware",
+]
+
+
+def build_handler(middleware):
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+    return handler
+
+
+def run(handler, path, requests):
+    factory = RequestFactory()
+    latencies = []
+    for _ in range(requests):
+        request = factory.post(path, b"{}", content_type="application/json", HTTP_X_API_KEY=settings.API_KEY)
+        started = time.perf_counter()
+        response = handler.get_response(request)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.content
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--path", default="/api/notify/")
+    args = parser.parse_args()
+
+    results = {}
+    for name, middleware in (("stock", STOCK_MIDDLEWARE), ("settings", settings.MIDDLEWARE)):
+        handler = build_handler(middleware)
+        run(handler, args.path, min(args.requests, 1000))  # warm up
+        results[name] = latencies = run(handler, args.path, args.requests)
+        print(
+            f"{name:<9} mean {statistics.mean(latencies) * 1e6:7.1f} us  "
+            f"p50 {latencies[len(latencies) // 2] * 1e6:7.1f} us  "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:7.1f} us"
+        )
+
+    saved = statistics.mean(results["stock"]) - statistics.mean(results["settings"])
+    print(f"saved     {saved * 1e6:7.1f} us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,37 @@ import os
 API_URL = os.getenv("API_URL", "http://web:8000/api")
 API_KEY = os.getenv("API_KEY", "12345")
 
+# HTTP client settings (shared aiohttp session to the backend)
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "10"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+API_POOL_LIMIT = int(os.getenv("API_POOL_LIMIT", "100"))
+API_POOL_LIMIT_PER_HOST = int(os.getenv("API_POOL_LIMIT_PER_HOST", "50"))
+API_KEEPALIVE_TIMEOUT = float(os.getenv("API_KEEPALIVE_TIMEOUT", "30"))
+
+# FSM storage: "memory" (single process, lost on restart) or "redis" (shared by replicas)
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/2")
+# Abandoned dialogs expire after this many seconds; every step refreshes the TTL
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "3600"))
+FSM_DATA_TTL = int(os.getenv("FSM_DATA_TTL", "3600"))
+
+# Update delivery: "polling" (single instance) or "webhook" (aiohttp server, can run several replicas)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv(
+    "WEBHOOK_URL", ""
+)  # public base URL Telegram posts to, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+# Updates handled at once per instance; further requests wait, so Telegram backs off
+WEBHOOK_MAX_CONCURRENT_UPDATES = int(os.getenv("WEBHOOK_MAX_CONCURRENT_UPDATES", "100"))
+# Connections Telegram may open to one webhook URL (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Prometheus metrics port (0 disables)
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "0"))
+
 # User limits (should match backend settings)
 MAX_TAGS_PER_USER = 4
 MAX_PENDING_TASKS_PER_USER = 6
@@ -15,16 +15,22 @@ from .tags import (
 )
 from .tasks import (
     CreateTaskState,
+    SelectTasksState,
+    apply_task_selection,
+    cancel_task_selection,
     cmd_archive,
     cmd_delete_task_confirm,
     cmd_delete_task_start,
     cmd_list_tasks,
     cmd_new_task,
+    cmd_select_tasks,
     finish_tag_selection,
     process_notify_time,
     process_task_title,
+    show_archive_page,
     skip_tag_selection,
     toggle_tag_selection,
+    toggle_task_selection,
 )
 
 
@@ -41,6 +47,8 @@ def register_handlers(dp: Dispatcher):
     dp.message.register(cmd_archive, F.text == "📦 Архив")
     dp.message.register(cmd_delete_task_start, Command("delete_task"))
     dp.message.register(cmd_delete_task_start, F.text == "🗑 Удалить задачу")
+    dp.message.register(cmd_select_tasks, Command("select"))
+    dp.message.register(cmd_select_tasks, F.text == "☑️ Несколько задач")
 
     # Task FSM
     dp.message.register(process_task_title, CreateTaskState.title)
@@ -57,6 +65,18 @@ def register_handlers(dp: Dispatcher):
         skip_tag_selection, CreateTaskState.tags, F.data == "tags_skip"
     )
     dp.callback_query.register(cmd_delete_task_confirm, F.data.startswith("del_task_"))
+    dp.callback_query.register(show_archive_page, F.data.startswith("archive_"))
+    dp.callback_query.register(
+        toggle_task_selection, SelectTasksState.tasks, F.data.startswith("sel_task_")
+    )
+    dp.callback_query.register(
+        apply_task_selection,
+        SelectTasksState.tasks,
+        F.data.in_({"sel_complete", "sel_delete"}),
+    )
+    dp.callback_query.register(
+        cancel_task_selection, SelectTasksState.tasks, F.data == "sel_cancel"
+    )
 
     # Tags
     dp.message.register(cmd_list_tags, Command("tags"))
@@ -22,6 +22,7 @@ def get_main_keyboard():
                 KeyboardButton(text="🗑 Удалить задачу"),
                 KeyboardButton(text="➕ Новый тег"),
             ],
+            [KeyboardButton(text="☑️ Несколько задач")],
         ],
         resize_keyboard=True,
     )
@@ -43,8 +44,9 @@ async def cmd_start(message: types.Message):
         "➕ Новая задача - создать с уведомлением (1мин, 2мин, 5мин, 10мин, 1час)\n"
         "📋 Мои задачи - активные задачи (макс. 6)\n"
         f"🏷 Теги - управление тегами (макс. {MAX_TAGS_PER_USER})\n"
-        f"📦 Архив - последние {MAX_ARCHIVE_TASKS_PER_USER} завершённых\n"
+        f"📦 Архив - завершённые задачи, по {MAX_ARCHIVE_TASKS_PER_USER} на странице\n"
         "🗑 Удалить задачу\n"
+        "☑️ Несколько задач - выполнить или удалить сразу несколько\n"
         "➕ Новый тег - быстрое создание",
         reply_markup=get_main_keyboard(),
     )
@@ -5,11 +5,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardButton
 
-from config import (
-    MAX_ARCHIVE_TASKS_PER_USER,
-    MAX_PENDING_TASKS_PER_USER,
-    MAX_TAGS_PER_USER,
-)
+from config import MAX_PENDING_TASKS_PER_USER, MAX_TAGS_PER_USER
 from handlers.common import create_keyboard, get_main_keyboard
 from services import api_client
 
@@ -20,17 +16,30 @@ class CreateTaskState(StatesGroup):
     tags = State()
 
 
+class SelectTasksState(StatesGroup):
+    tasks = State()
+
+
 async def cmd_new_task(message: types.Message, state: FSMContext):
     await state.set_state(CreateTaskState.title)
-    await message.answer("Введите название задачи:")
+    await message.answer("Введите название задачи (несколько строк — несколько задач):")
 
 
 async def process_task_title(message: types.Message, state: FSMContext):
-    if not message.text or not message.text.strip():
+    # Each non-empty line is a separate task
+    titles = [
+        line.strip() for line in (message.text or "").splitlines() if line.strip()
+    ]
+    if not titles:
         await message.answer("❌ Название не может быть пустым")
         return
+    if len(titles) > MAX_PENDING_TASKS_PER_USER:
+        await message.answer(
+            f"❌ Слишком много задач за раз (макс. {MAX_PENDING_TASKS_PER_USER})"
+        )
+        return
 
-    await state.update_data(title=message.text.strip())
+    await state.update_data(titles=titles)
     keyboard = create_keyboard(
         [
             [
@@ -78,7 +87,9 @@ async def process_notify_time(callback: types.CallbackQuery, state: FSMContext):
         f"Выберите теги (макс. {MAX_TAGS_PER_USER}):",
         reply_markup=create_keyboard(buttons),
     )
-    await state.update_data(selected_tags=[])
+    # id -> name, kept for the rest of the dialog; JSON-safe keys for Redis storage
+    tag_names = {str(t["id"]): t["name"] for t in tags}
+    await state.update_data(selected_tags=[], tag_names=tag_names)
     await state.set_state(CreateTaskState.tags)
     await callback.answer()
 
@@ -87,6 +98,11 @@ async def toggle_tag_selection(callback: types.CallbackQuery, state: FSMContext)
     tag_id = callback.data.replace("tag_", "")
     data = await state.get_data()
     selected = data.get("selected_tags", [])
+    tag_names = data.get("tag_names", {})
+
+    if tag_id not in tag_names:
+        await callback.answer()
+        return
 
     if tag_id in selected:
         selected.remove(tag_id)
@@ -99,7 +115,9 @@ async def toggle_tag_selection(callback: types.CallbackQuery, state: FSMContext)
         selected.append(tag_id)
 
     await state.update_data(selected_tags=selected)
-    await callback.answer(f"Выбрано: {len(selected)}")
+    await callback.answer(
+        f"Выбрано: {', '.join(tag_names[tid] for tid in selected) or 'ничего'}"
+    )
 
 
 async def finish_tag_selection(callback: types.CallbackQuery, state: FSMContext):
@@ -117,35 +135,40 @@ async def skip_tag_selection(callback: types.CallbackQuery, state: FSMContext):
 
 async def finalize_task_creation(user_id, state: FSMContext, message):
     data = await state.get_data()
-    tag_ids = data.get("selected_tags", [])
-
-    tag_names = []
-    if tag_ids:
-        tags_result = await api_client.api_request(
-            "GET", "/tags/", params={"telegram_id": user_id}
+    titles = data["titles"]
+    selected = data.get("selected_tags", [])
+    tag_names = data.get("tag_names", {})
+    task = {"due_date": data.get("due_date"), "tag_ids": [int(t) for t in selected]}
+
+    if len(titles) == 1:
+        result = await api_client.api_request(
+            "POST",
+            "/tasks/create/",
+            json={"telegram_id": user_id, "title": titles[0], **task},
+        )
+    else:
+        result = await api_client.api_request(
+            "POST",
+            "/tasks/bulk_create/",
+            json={
+                "telegram_id": user_id,
+                "tasks": [{"title": title, **task} for title in titles],
+            },
         )
-        all_tags = tags_result.get("tags", [])
-        tag_names = [
-            t["name"] for t in all_tags if str(t["id"]) in [str(tid) for tid in tag_ids]
-        ]
-
-    result = await api_client.api_request(
-        "POST",
-        "/tasks/create/",
-        json={
-            "telegram_id": user_id,
-            "title": data["title"],
-            "due_date": data.get("due_date"),
-            "tags": tag_names,
-        },
-    )
 
     if "error" in result:
         await message.answer(f"❌ {result['error']}", reply_markup=get_main_keyboard())
+        return
+
+    names = [tag_names[tid] for tid in selected if tid in tag_names]
+    tags = f" [{', '.join(names)}]" if names else ""
+    if len(titles) == 1:
+        text = f"✅ Задача создана: {titles[0]}{tags}"
     else:
-        await message.answer(
-            f"✅ Задача создана: {data['title']}", reply_markup=get_main_keyboard()
+        text = f"✅ Создано задач: {len(titles)}{tags}\n" + "\n".join(
+            f"• {title}" for title in titles
         )
+    await message.answer(text, reply_markup=get_main_keyboard())
 
 
 async def cmd_list_tasks(message: types.Message):
@@ -167,6 +190,29 @@ async def cmd_list_tasks(message: types.Message):
     await message.answer(text, reply_markup=get_main_keyboard())
 
 
+def format_archive_page(tasks, first_page=True):
+    text = "📦 Архив:\n\n" if first_page else "📦 Архив (дальше):\n\n"
+    for t in tasks:
+        status = "✅" if t["status"] == "completed" else "🗑"
+        tags = f" [{', '.join(t['tags'])}]" if t["tags"] else ""
+        text += f"{status} {t['title']}{tags}\n  📅 {t['created_at']}\n\n"
+    return text
+
+
+def archive_next_keyboard(next_cursor):
+    if not next_cursor:
+        return None
+    return create_keyboard(
+        [
+            [
+                InlineKeyboardButton(
+                    text="➡️ Дальше", callback_data=f"archive_{next_cursor}"
+                )
+            ]
+        ]
+    )
+
+
 async def cmd_archive(message: types.Message):
     result = await api_client.api_request(
         "GET", "/archive/", params={"telegram_id": message.from_user.id}
@@ -177,12 +223,30 @@ async def cmd_archive(message: types.Message):
         await message.answer("📦 Архив пуст", reply_markup=get_main_keyboard())
         return
 
-    text = f"📦 Архив (последние {MAX_ARCHIVE_TASKS_PER_USER}):\n\n"
-    for t in tasks:
-        status = "✅" if t["status"] == "completed" else "🗑"
-        tags = f" [{', '.join(t['tags'])}]" if t["tags"] else ""
-        text += f"{status} {t['title']}{tags}\n  📅 {t['created_at']}\n\n"
-    await message.answer(text, reply_markup=get_main_keyboard())
+    await message.answer(
+        format_archive_page(tasks),
+        reply_markup=archive_next_keyboard(result.get("next_cursor"))
+        or get_main_keyboard(),
+    )
+
+
+async def show_archive_page(callback: types.CallbackQuery):
+    cursor = callback.data.replace("archive_", "")
+    result = await api_client.api_request(
+        "GET",
+        "/archive/",
+        params={"telegram_id": callback.from_user.id, "cursor": cursor},
+    )
+    tasks = result.get("tasks", [])
+
+    if "error" in result or not tasks:
+        await callback.message.edit_reply_markup(reply_markup=None)
+    else:
+        await callback.message.edit_text(
+            format_archive_page(tasks, first_page=False),
+            reply_markup=archive_next_keyboard(result.get("next_cursor")),
+        )
+    await callback.answer()
 
 
 async def cmd_delete_task_start(message: types.Message):
@@ -219,3 +283,94 @@ async def cmd_delete_task_confirm(callback: types.CallbackQuery):
         )
         await callback.message.delete()
     await callback.answer()
+
+
+def task_selection_keyboard(task_titles, selected):
+    buttons = [
+        [
+            InlineKeyboardButton(
+                text=f"{'☑️' if task_id in selected else '▫️'} {title}",
+                callback_data=f"sel_task_{task_id}",
+            )
+        ]
+        for task_id, title in task_titles.items()
+    ]
+    buttons.append(
+        [
+            InlineKeyboardButton(text="✅ Выполнить", callback_data="sel_complete"),
+            InlineKeyboardButton(text="🗑 Удалить", callback_data="sel_delete"),
+        ]
+    )
+    buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="sel_cancel")])
+    return create_keyboard(buttons)
+
+
+async def cmd_select_tasks(message: types.Message, state: FSMContext):
+    result = await api_client.api_request(
+        "GET", "/tasks/", params={"telegram_id": message.from_user.id}
+    )
+    tasks = result.get("tasks", [])
+
+    if not tasks:
+        await message.answer("📋 Нет активных задач", reply_markup=get_main_keyboard())
+        return
+
+    task_titles = {str(t["id"]): t["title"] for t in tasks}
+    await state.set_state(SelectTasksState.tasks)
+    await state.update_data(task_titles=task_titles, selected_task_ids=[])
+    await message.answer(
+        "Отметьте задачи и выберите действие:",
+        reply_markup=task_selection_keyboard(task_titles, []),
+    )
+
+
+async def toggle_task_selection(callback: types.CallbackQuery, state: FSMContext):
+    task_id = callback.data.replace("sel_task_", "")
+    data = await state.get_data()
+    task_titles = data.get("task_titles", {})
+    selected = data.get("selected_task_ids", [])
+
+    if task_id in selected:
+        selected.remove(task_id)
+    elif task_id in task_titles:
+        selected.append(task_id)
+
+    await state.update_data(selected_task_ids=selected)
+    await callback.message.edit_reply_markup(
+        reply_markup=task_selection_keyboard(task_titles, selected)
+    )
+    await callback.answer()
+
+
+async def apply_task_selection(callback: types.CallbackQuery, state: FSMContext):
+    action = callback.data.replace("sel_", "")
+    data = await state.get_data()
+    selected = data.get("selected_task_ids", [])
+
+    if not selected:
+        await callback.answer("Ничего не выбрано", show_alert=True)
+        return
+
+    result = await api_client.api_request(
+        "POST",
+        f"/tasks/bulk_{action}/",
+        json={
+            "telegram_id": callback.from_user.id,
+            "task_ids": [int(task_id) for task_id in selected],
+        },
+    )
+    await state.clear()
+
+    if "error" in result:
+        await callback.message.edit_text(f"❌ {result['error']}")
+    else:
+        done = sum(1 for r in result.get("results", []) if r["result"] == "ok")
+        verb = "Выполнено" if action == "complete" else "Удалено"
+        await callback.message.edit_text(f"✅ {verb} задач: {done}")
+    await callback.answer()
+
+
+async def cancel_task_selection(callback: types.CallbackQuery, state: FSMContext):
+    await state.clear()
+    await callback.message.delete()
+    await callback.answer()
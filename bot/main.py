@@ -2,16 +2,53 @@ import asyncio
 import os
 
 from aiogram import Bot, Dispatcher
+from aiohttp import web
 
-from config import BOT_TOKEN
+from config import (
+    BOT_METRICS_PORT,
+    BOT_MODE,
+    BOT_TOKEN,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBHOOK_MAX_CONCURRENT_UPDATES,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
 from handlers import register_handlers
+from services import api_client
+from services.metrics import start_metrics_server
+from services.storage import create_fsm_storage
+from services.webhook import create_webhook_app
 
 bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+storage, events_isolation = create_fsm_storage()
+dp = Dispatcher(storage=storage, events_isolation=events_isolation)
 
 register_handlers(dp)
 
 
+async def on_startup():
+    await api_client.init_session()
+    if BOT_MODE == "webhook":
+        # Every replica registers the same URL; the load balancer spreads the updates
+        await bot.set_webhook(
+            f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+
+
+async def on_shutdown():
+    await api_client.close_session()
+    await dp.fsm.close()
+
+
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
+
+
 async def main():
     try:
         me = await bot.get_me()
@@ -21,4 +58,15 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    start_metrics_server(BOT_METRICS_PORT)
+    if BOT_MODE == "webhook":
+        app = create_webhook_app(
+            dp,
+            bot,
+            path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            max_concurrent=WEBHOOK_MAX_CONCURRENT_UPDATES,
+        )
+        web.run_app(app, host=WEBAPP_HOST, port=WEBAPP_PORT)
+    else:
+        asyncio.run(main())
@@ -1,28 +1,74 @@
+import time
+
 import aiohttp
 
-from config import API_KEY, API_URL
+from config import (
+    API_CONNECT_TIMEOUT,
+    API_KEEPALIVE_TIMEOUT,
+    API_KEY,
+    API_POOL_LIMIT,
+    API_POOL_LIMIT_PER_HOST,
+    API_TIMEOUT,
+    API_URL,
+)
+from services.metrics import API_REQUEST_LATENCY
+
+_session: aiohttp.ClientSession | None = None
+
+
+def _create_session():
+    connector = aiohttp.TCPConnector(
+        limit=API_POOL_LIMIT,
+        limit_per_host=API_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(total=API_TIMEOUT, connect=API_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector, timeout=timeout, headers={"X-API-Key": API_KEY}
+    )
+
+
+async def init_session():
+    """Create the process-wide session (called on bot startup)"""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+
+async def close_session():
+    """Close the process-wide session (called on bot shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
 
 async def api_request(method, endpoint, **kwargs):
     url = f"{API_URL}{endpoint}"
-    headers = kwargs.get("headers", {})
-    headers["X-API-Key"] = API_KEY
-    kwargs["headers"] = headers
+    started = time.perf_counter()
+    status = "error"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, url, **kwargs) as response:
-                data = await response.json()
-                if response.status >= 400:
-                    error_msg = (
-                        data.get("error", f"HTTP {response.status}")
-                        if isinstance(data, dict)
-                        else f"HTTP {response.status}"
-                    )
-                    return {"error": error_msg}
-                return data
+        session = await init_session()
+        async with session.request(method, url, **kwargs) as response:
+            status = str(response.status)
+            data = await response.json()
+            if response.status >= 400:
+                error_msg = (
+                    data.get("error", f"HTTP {response.status}")
+                    if isinstance(data, dict)
+                    else f"HTTP {response.status}"
+                )
+                return {"error": error_msg}
+            return data
     except aiohttp.ContentTypeError:
         return {"error": "Некорректный ответ сервера"}
     except aiohttp.ClientError as e:
         return {"error": f"Ошибка соединения: {e}"}
     except Exception as e:
         return {"error": str(e)}
+    finally:
+        API_REQUEST_LATENCY.labels(
+            method=method, endpoint=endpoint, status=status
+        ).observe(time.perf_counter() - started)
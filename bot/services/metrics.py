@@ -0,0 +1,13 @@
+from prometheus_client import Histogram, start_http_server
+
+API_REQUEST_LATENCY = Histogram(
+    "bot_api_request_seconds",
+    "Backend API requests made by the bot ('error' status: no HTTP response)",
+    ["method", "endpoint", "status"],
+)
+
+
+def start_metrics_server(port):
+    """Serve /metrics on `port` from a background thread (0 disables)"""
+    if port:
+        start_http_server(port)
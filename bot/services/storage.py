@@ -0,0 +1,22 @@
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage
+from aiogram.fsm.storage.memory import DisabledEventIsolation, MemoryStorage
+
+from config import FSM_DATA_TTL, FSM_STATE_TTL, FSM_STORAGE, REDIS_URL
+
+
+def create_fsm_storage() -> tuple[BaseStorage, BaseEventIsolation]:
+    """FSM storage and event isolation for the Dispatcher, selected by FSM_STORAGE"""
+    if FSM_STORAGE == "memory":
+        return MemoryStorage(), DisabledEventIsolation()
+    if FSM_STORAGE == "redis":
+        from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+
+        storage = RedisStorage.from_url(
+            REDIS_URL,
+            key_builder=DefaultKeyBuilder(prefix="fsm"),
+            state_ttl=FSM_STATE_TTL,
+            data_ttl=FSM_DATA_TTL,
+        )
+        # Replicas share the state, so one user's updates must not be handled concurrently
+        return storage, storage.create_isolation()
+    raise ValueError(f"Unknown FSM_STORAGE: {FSM_STORAGE}")
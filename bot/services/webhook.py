@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Dict, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """
+    Answers Telegram right away and handles updates in the background,
+    at most `max_concurrent` at a time. Built on the public `handle` and
+    Dispatcher.feed_raw_update only, so aiogram upgrades can't bypass the limit.
+    """
+
+    def __init__(self, *args: Any, max_concurrent: int, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not self.verify_secret(secret, bot):
+            return web.Response(body="Unauthorized", status=401)
+
+        update = await request.json(loads=bot.session.json_loads)
+        # Hold the request until a slot frees up instead of queueing without bound
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process_update(bot, update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    __call__ = handle
+
+    async def _process_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            result = await self.dispatcher.feed_raw_update(
+                bot=bot, update=update, **self.data
+            )
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(bot=bot, result=result)
+        finally:
+            self._slots.release()
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def create_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    path: str,
+    secret_token: str = "",
+    max_concurrent: int = 100,
+) -> web.Application:
+    app = web.Application()
+    LimitedRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret_token or None,
+        max_concurrent=max_concurrent,
+    ).register(app, path=path)
+    app.router.add_get("/health", health)
+    setup_application(app, dispatcher, bot=bot)
+    return app
@@ -1,9 +1,12 @@
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+import pytest_asyncio
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
+from services import api_client
+
 
 @pytest.fixture
 def bot():
@@ -20,3 +23,10 @@ def dp():
 @pytest.fixture
 def mock_api_request(mocker):
     return mocker.patch("services.api_client.api_request", new_callable=AsyncMock)
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def api_session():
+    # The shared session is bound to the event loop of the test that created it
+    yield
+    await api_client.close_session()
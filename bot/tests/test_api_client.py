@@ -2,9 +2,10 @@ from unittest.mock import AsyncMock, MagicMock
 
 import aiohttp
 import pytest
+from prometheus_client import REGISTRY
 
 from config import API_KEY, API_URL
-from services.api_client import api_request
+from services.api_client import api_request, close_session, init_session
 
 
 @pytest.mark.asyncio
@@ -45,3 +46,61 @@ async def test_api_request_error(mocker):
     # Assert
     assert "error" in result
     assert result["error"] == "Bad request"
+
+
+@pytest.mark.asyncio
+async def test_api_request_reuses_session(mocker):
+    # Arrange
+    mock_response = AsyncMock()
+    mock_response.status = 200
+    mock_response.json = AsyncMock(return_value={"data": "test"})
+
+    mock_ctx = MagicMock()
+    mock_ctx.__aenter__.return_value = mock_response
+
+    mocker.patch("aiohttp.ClientSession.request", return_value=mock_ctx)
+    session = await init_session()
+
+    # Act
+    await api_request("GET", "/test/")
+    await api_request("GET", "/test/")
+
+    # Assert
+    assert await init_session() is session
+    assert session.headers["X-API-Key"] == API_KEY
+
+
+@pytest.mark.asyncio
+async def test_close_session():
+    # Arrange
+    session = await init_session()
+
+    # Act
+    await close_session()
+
+    # Assert
+    assert session.closed
+    assert await init_session() is not session
+
+
+@pytest.mark.asyncio
+async def test_api_request_latency_recorded(mocker):
+    # Arrange
+    mock_response = AsyncMock()
+    mock_response.status = 400
+    mock_response.json = AsyncMock(return_value={"error": "Bad request"})
+
+    mock_ctx = MagicMock()
+    mock_ctx.__aenter__.return_value = mock_response
+
+    mocker.patch("aiohttp.ClientSession.request", return_value=mock_ctx)
+    sample = {"method": "GET", "endpoint": "/test/", "status": "400"}
+    before = REGISTRY.get_sample_value("bot_api_request_seconds_count", sample) or 0
+
+    # Act
+    await api_request("GET", "/test/")
+
+    # Assert
+    assert (
+        REGISTRY.get_sample_value("bot_api_request_seconds_count", sample) == before + 1
+    )
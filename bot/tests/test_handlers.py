@@ -1,7 +1,7 @@
 from unittest.mock import ANY, AsyncMock, MagicMock
 
 import pytest
-from aiogram.types import Chat, Message, User
+from aiogram.types import CallbackQuery, Chat, Message, User
 
 from config import (
     MAX_ARCHIVE_TASKS_PER_USER,
@@ -9,7 +9,15 @@ from config import (
     MAX_TAGS_PER_USER,
 )
 from handlers.common import cmd_start
-from handlers.tasks import cmd_list_tasks
+from handlers.tasks import (
+    apply_task_selection,
+    cmd_archive,
+    cmd_list_tasks,
+    finalize_task_creation,
+    show_archive_page,
+    toggle_tag_selection,
+    toggle_task_selection,
+)
 
 
 @pytest.mark.asyncio
@@ -79,3 +87,190 @@ async def test_cmd_list_tasks_with_results(mock_api_request):
     assert "📋 Задачи" in text
     assert "Test Task" in text
     assert "[work]" in text
+
+
+@pytest.mark.asyncio
+async def test_finalize_task_creation_single_request(mock_api_request):
+    # Arrange
+    mock_api_request.return_value = {"id": 1, "title": "Test Task"}
+    state = AsyncMock()
+    state.get_data.return_value = {
+        "titles": ["Test Task"],
+        "due_date": "2024-01-02T00:00:00+00:00",
+        "selected_tags": ["3", "5"],
+        "tag_names": {"3": "work", "5": "home", "7": "misc"},
+    }
+    message = AsyncMock(spec=Message)
+    message.answer = AsyncMock()
+
+    # Act
+    await finalize_task_creation(123, state, message)
+
+    # Assert
+    mock_api_request.assert_called_once_with(
+        "POST",
+        "/tasks/create/",
+        json={
+            "telegram_id": 123,
+            "title": "Test Task",
+            "due_date": "2024-01-02T00:00:00+00:00",
+            "tag_ids": [3, 5],
+        },
+    )
+    assert "✅ Задача создана: Test Task [work, home]" in message.answer.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_finalize_task_creation_multiple_titles(mock_api_request):
+    # Arrange
+    mock_api_request.return_value = {"tasks": [{"id": 1}, {"id": 2}]}
+    state = AsyncMock()
+    state.get_data.return_value = {
+        "titles": ["Buy milk", "Call mom"],
+        "due_date": "2024-01-02T00:00:00+00:00",
+        "selected_tags": [],
+        "tag_names": {},
+    }
+    message = AsyncMock(spec=Message)
+    message.answer = AsyncMock()
+
+    # Act
+    await finalize_task_creation(123, state, message)
+
+    # Assert
+    task = {"due_date": "2024-01-02T00:00:00+00:00", "tag_ids": []}
+    mock_api_request.assert_called_once_with(
+        "POST",
+        "/tasks/bulk_create/",
+        json={
+            "telegram_id": 123,
+            "tasks": [{"title": "Buy milk", **task}, {"title": "Call mom", **task}],
+        },
+    )
+    assert "✅ Создано задач: 2" in message.answer.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_tag_selection_uses_cached_tag_names(mock_api_request):
+    # Arrange
+    state = AsyncMock()
+    state.get_data.return_value = {
+        "selected_tags": ["3"],
+        "tag_names": {"3": "work", "5": "home"},
+    }
+    callback = AsyncMock(spec=CallbackQuery)
+    callback.data = "tag_5"
+    callback.answer = AsyncMock()
+
+    # Act
+    await toggle_tag_selection(callback, state)
+
+    # Assert
+    mock_api_request.assert_not_called()
+    state.update_data.assert_called_once_with(selected_tags=["3", "5"])
+    callback.answer.assert_called_once_with("Выбрано: work, home")
+
+
+ARCHIVED_TASK = {
+    "id": 1,
+    "title": "Old Task",
+    "status": "completed",
+    "tags": [],
+    "created_at": "2024-01-01",
+}
+
+
+@pytest.mark.asyncio
+async def test_cmd_archive_next_page_button(mock_api_request):
+    # Arrange
+    message = AsyncMock(spec=Message)
+    message.answer = AsyncMock()
+    message.from_user = MagicMock(spec=User)
+    message.from_user.id = 123
+    mock_api_request.return_value = {"tasks": [ARCHIVED_TASK], "next_cursor": "1a.2"}
+
+    # Act
+    await cmd_archive(message)
+
+    # Assert
+    markup = message.answer.call_args.kwargs["reply_markup"]
+    assert markup.inline_keyboard[0][0].callback_data == "archive_1a.2"
+
+
+@pytest.mark.asyncio
+async def test_show_archive_page(mock_api_request):
+    # Arrange
+    callback = AsyncMock(spec=CallbackQuery)
+    callback.data = "archive_1a.2"
+    callback.from_user = MagicMock(spec=User)
+    callback.from_user.id = 123
+    callback.message = AsyncMock(spec=Message)
+    callback.message.edit_text = AsyncMock()
+    callback.answer = AsyncMock()
+    mock_api_request.return_value = {"tasks": [ARCHIVED_TASK], "next_cursor": None}
+
+    # Act
+    await show_archive_page(callback)
+
+    # Assert
+    mock_api_request.assert_called_once_with(
+        "GET", "/archive/", params={"telegram_id": 123, "cursor": "1a.2"}
+    )
+    args, kwargs = callback.message.edit_text.call_args
+    assert "Old Task" in args[0]
+    assert kwargs["reply_markup"] is None
+    callback.answer.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_toggle_task_selection_marks_button():
+    # Arrange
+    state = AsyncMock()
+    state.get_data.return_value = {
+        "task_titles": {"1": "First", "2": "Second"},
+        "selected_task_ids": [],
+    }
+    callback = AsyncMock(spec=CallbackQuery)
+    callback.data = "sel_task_2"
+    callback.answer = AsyncMock()
+    callback.message = AsyncMock(spec=Message)
+    callback.message.edit_reply_markup = AsyncMock()
+
+    # Act
+    await toggle_task_selection(callback, state)
+
+    # Assert
+    state.update_data.assert_called_once_with(selected_task_ids=["2"])
+    markup = callback.message.edit_reply_markup.call_args.kwargs["reply_markup"]
+    labels = [row[0].text for row in markup.inline_keyboard[:2]]
+    assert labels == ["▫️ First", "☑️ Second"]
+
+
+@pytest.mark.asyncio
+async def test_apply_task_selection_single_request(mock_api_request):
+    # Arrange
+    mock_api_request.return_value = {
+        "results": [
+            {"task_id": 1, "result": "ok"},
+            {"task_id": 2, "result": "not_found"},
+        ]
+    }
+    state = AsyncMock()
+    state.get_data.return_value = {"selected_task_ids": ["1", "2"]}
+    callback = AsyncMock(spec=CallbackQuery)
+    callback.data = "sel_complete"
+    callback.from_user = MagicMock(spec=User)
+    callback.from_user.id = 123
+    callback.answer = AsyncMock()
+    callback.message = AsyncMock(spec=Message)
+    callback.message.edit_text = AsyncMock()
+
+    # Act
+    await apply_task_selection(callback, state)
+
+    # Assert
+    mock_api_request.assert_called_once_with(
+        "POST", "/tasks/bulk_complete/", json={"telegram_id": 123, "task_ids": [1, 2]}
+    )
+    state.clear.assert_called_once()
+    callback.message.edit_text.assert_called_once_with("✅ Выполнено задач: 1")
@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisEventIsolation, RedisStorage
+
+from services import storage as storage_module
+
+KEY = StorageKey(bot_id=1, chat_id=123, user_id=123)
+
+
+def test_memory_storage_by_default():
+    # Act
+    storage, _ = storage_module.create_fsm_storage()
+
+    # Assert
+    assert isinstance(storage, MemoryStorage)
+
+
+@pytest.mark.asyncio
+async def test_redis_storage_expires_dialogs(mocker):
+    # Arrange
+    mocker.patch.object(storage_module, "FSM_STORAGE", "redis")
+    mocker.patch.object(storage_module, "FSM_STATE_TTL", 600)
+    mocker.patch.object(storage_module, "FSM_DATA_TTL", 900)
+    storage, isolation = storage_module.create_fsm_storage()
+    storage.redis = AsyncMock()
+
+    # Act
+    await storage.set_state(KEY, "CreateTaskState:title")
+    await storage.set_data(KEY, {"title": "Test Task"})
+
+    # Assert
+    assert isinstance(storage, RedisStorage)
+    assert isinstance(isolation, RedisEventIsolation)
+    storage.redis.set.assert_any_await(
+        "fsm:123:123:state", "CreateTaskState:title", ex=600
+    )
+    storage.redis.set.assert_any_await(
+        "fsm:123:123:data", '{"title": "Test Task"}', ex=900
+    )
+
+
+def test_unknown_storage(mocker):
+    # Arrange
+    mocker.patch.object(storage_module, "FSM_STORAGE", "sqlite")
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        storage_module.create_fsm_storage()
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from services.webhook import create_webhook_app
+
+
+def make_update(update_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 123, "type": "private"},
+            "text": "hi",
+        },
+    }
+
+
+@pytest.fixture
+def dispatcher():
+    dp = Dispatcher()
+    dp.handled = []
+    dp.release = asyncio.Event()
+
+    @dp.message()
+    async def handler(message):
+        dp.handled.append(message.message_id)
+        await dp.release.wait()
+
+    return dp
+
+
+@pytest.mark.asyncio
+async def test_webhook_limits_concurrent_updates(dispatcher):
+    # Arrange
+    app = create_webhook_app(
+        dispatcher, Bot(token="123:abc"), path="/webhook", max_concurrent=2
+    )
+
+    async with TestClient(TestServer(app)) as client:
+        # Act
+        posts = [
+            asyncio.create_task(client.post("/webhook", json=make_update(i)))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0.1)
+        handled_while_blocked = len(dispatcher.handled)
+        dispatcher.release.set()
+        responses = await asyncio.gather(*posts)
+        await asyncio.sleep(0.1)
+
+    # Assert
+    assert handled_while_blocked == 2
+    assert [r.status for r in responses] == [200] * 5
+    assert sorted(dispatcher.handled) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret(dispatcher):
+    # Arrange
+    app = create_webhook_app(
+        dispatcher, Bot(token="123:abc"), path="/webhook", secret_token="s3cret"
+    )
+
+    async with TestClient(TestServer(app)) as client:
+        # Act
+        wrong = await client.post(
+            "/webhook",
+            json=make_update(1),
+            headers={"X-Telegram-Bot-Api-Secret-Token": "nope"},
+        )
+        health = await client.get("/health")
+
+    # Assert
+    assert wrong.status == 401
+    assert health.status == 200
+    assert dispatcher.handled == []
+
+
+@pytest.mark.asyncio
+async def test_webhook_replies_through_bot_api():
+    # Arrange: a local stand-in for api.telegram.org
+    sent = []
+
+    async def send_message(request):
+        sent.append(dict(await request.post()))
+        message = {"message_id": 1, "date": 0, "chat": {"id": 123, "type": "private"}}
+        return web.json_response({"ok": True, "result": message})
+
+    telegram = web.Application()
+    telegram.router.add_post("/bot{token}/sendMessage", send_message)
+    dp = Dispatcher()
+
+    @dp.message()
+    async def pong(message):
+        await message.answer("pong")
+
+    async with TestServer(telegram) as telegram_server:
+        api = TelegramAPIServer.from_base(str(telegram_server.make_url("")))
+        bot = Bot(token="123:abc", session=AiohttpSession(api=api))
+        app = create_webhook_app(dp, bot, path="/webhook")
+
+        async with TestClient(TestServer(app)) as client:
+            # Act
+            response = await client.post("/webhook", json=make_update(1))
+            await asyncio.sleep(0.1)
+
+    # Assert
+    assert response.status == 200
+    assert sent == [{"chat_id": "123", "text": "pong"}]